@@ -21,12 +21,17 @@
 Generator algo for SimuTable
 
 """
-import io
+import codecs
 import importlib
 import numbers
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pprint import pformat
 import numpy as np
 import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
 from artemis_format.pymodels.cronus_pb2 import FileObjectInfo
 from artemis_format.pymodels.table_pb2 import Table
@@ -37,7 +42,27 @@ from artemis_base.utils.decorators import iterable
 from artemis_base.core.properties import Properties
 
 
-from dolos.simutable.synthesizer import Synthesizer
+from dolos.simutable.synthesizer import Synthesizer, as_column
+
+
+# Arrow types of the Table field types
+ARROW_TYPES = {
+    "String": pa.string(),
+    "Integer": pa.int64(),
+    "Float": pa.float64(),
+    "DateTime": pa.timestamp("us"),
+}
+
+# Low cardinality generators stored as dictionary encoded columns
+DICTIONARY_GENERATORS = {
+    "city",
+    "country",
+    "country_code",
+    "province",
+    "province_abbr",
+    "state",
+    "state_abbr",
+}
 
 
 def check_random_state(seed):
@@ -74,6 +99,18 @@ class RecordBatchGenOptions:
     file_type = 1
     codec = "utf8"
     linesep = "\r\n"
+    locale = "en_CA"
+    workers = 0
+    prefetch = 0
+    seekable = False
+    pool_size = 0
+    pool_refresh = 0
+    pool_evict = 1.0
+    reservoir_size = 0
+    column_batches = False
+    parquet_row_group_size = 0
+    parquet_compression = "snappy"
+    parquet_dictionary = True
 
 
 @Logger.logged
@@ -92,8 +129,13 @@ class RecordBatchGen:
 
         if hasattr(self.properties, "seed"):
             self.rnd = check_random_state(seed=self.properties.seed)
+            self._base_seed = self.properties.seed
         else:
             self.rnd = check_random_state(seed=None)
+            self._base_seed = int(self.rnd.randint(0, 2 ** 31 - 1))
+
+        # Options to reconstruct the generator in a worker process
+        self._options = options
 
         if hasattr(self.properties, "nbatches"):
             self._nbatches = self.properties.nbatches
@@ -117,11 +159,35 @@ class RecordBatchGen:
         self.nsamples = self.properties.nsamples
         self.file_type = self.properties.file_type
         self.codec = self.properties.codec
+        self.workers = self.properties.workers
+        self.prefetch = self.properties.prefetch
+
+        # Batches are seeded by index when generated out of order,
+        # when any batch must be reproducible on its own, or with a seed
+        # so that the data does not depend on the number of workers
+        self._per_batch_seed = (
+            self.workers > 0
+            or self.properties.seekable
+            or hasattr(self.properties, "seed")
+        )
+        # Number of batches generated ahead of the consumer
+        self._depth = self.prefetch or 2 * self.workers
+        self._executor = None
+        self._produce_fn = None
+        self._pending = deque()
+        # Pending duplicates are emitted within the batch being generated
+        self._drain = False
+        # Latest synthesizer metrics of each worker process
+        self._worker_metrics = {}
 
         self.synthesizer = None
         self.num_cols = None
         self.write_batch = None
         self.header = None
+        self.pa_schema = None
+        self._csv_header = b""
+        self._csv_options = None
+        self._csv_transcode = False
 
         # FWF
         self.pos_char = {
@@ -149,6 +215,8 @@ class RecordBatchGen:
             "9": "R",
         }
         # header = ''
+        self._fwf_layout = None
+        self._fwf_width = 0
         self.header_offset = 0
         self.footer = ""
         self.footer_size = 0
@@ -157,7 +225,6 @@ class RecordBatchGen:
         self.__logger.info(
             "%s properties: %s", self.__class__.__name__, self.properties
         )
-        print("Initialize RecordBatchGen")
 
     @property
     def random_state(self):
@@ -171,6 +238,7 @@ class RecordBatchGen:
         return self.__name
 
     def reset(self):
+        self.close()
         if hasattr(self, "_nbatches"):
             self._batch_iter = iter(range(self._nbatches))
         else:
@@ -242,24 +310,110 @@ class RecordBatchGen:
         for field in self.table.info.schema.info.fields:
             names.append(field.name)
         self.header = names
+        self.compile_csv_options()
 
-        if hasattr(self.properties, "seed"):
+        options = dict(
+            pool_size=self.properties.pool_size,
+            pool_refresh=self.properties.pool_refresh,
+            pool_evict=self.properties.pool_evict,
+            # Duplicates spread over later batches, within a batch
+            # when batches are seeded by index (seed, workers, seekable)
+            reservoir_size=self.properties.reservoir_size,
+        )
+        if hasattr(self.properties, "pool_fields"):
+            options["pool_fields"] = self.properties.pool_fields
+        # Paths of misspelling dictionaries, memory mapped by each worker
+        if hasattr(self.properties, "misspellings"):
+            options["misspellings"] = self.properties.misspellings
+        if hasattr(self.properties, "field_swaps"):
+            options["field_swaps"] = self.properties.field_swaps
+
+        # Batches seeded by index share the pools filled from the base seed
+        if self._per_batch_seed:
             self.synthesizer = Synthesizer(
-                self.table, "en_CA", idx=0, seed=self.properties.seed
+                self.table,
+                self.properties.locale,
+                idx=0,
+                seed=self._base_seed,
+                **options
             )
         else:
-            self.synthesizer = Synthesizer(self.table, "en_CA", idx=0)
+            self.synthesizer = Synthesizer(
+                self.table, self.properties.locale, idx=0, **options
+            )
+        self.compile_pa_schema()
 
         if self.file_type == 1:
             self.write_batch = self.write_batch_csv
         elif self.file_type == 2:
+            self.compile_fwf_layout()
             self.write_batch = self.write_batch_fwf
         elif self.file_type == 5:
             self.write_batch = self.write_batch_arrow
+        elif self.file_type == 6:
+            self.write_batch = self.write_batch_parquet
+
+    def compile_pa_schema(self):
+        """
+        Arrow schema from the Table field types
+        low cardinality generators are dictionary encoded,
+        fields edited by the modifier or swapped with a field
+        of another type are strings
+        Unsupported types are strings unless the output is typed
+        """
+        text = set()
+        mod = self.synthesizer.mod
+        if mod is not None:
+            text.update(mod.text_fields())
+        fields = []
+        for field in self.table.info.schema.info.fields:
+            try:
+                pa_type = ARROW_TYPES[field.info.type]
+            except KeyError:
+                if self.file_type in (5, 6):
+                    self.__logger.error(
+                        "Field %s unsupported type %s", field.name, field.info.type
+                    )
+                    raise ValueError("Unsupported field type %s" % field.info.type)
+                pa_type = pa.string()
+            fields.append(pa.field(field.name, pa_type))
+        types = {field.name: field.type for field in fields}
+        if mod is not None:
+            for left, right, _, _, _ in mod.field_swaps:
+                if types[left] != types[right]:
+                    text.update((left, right))
+        for idx, field in enumerate(self.table.info.schema.info.fields):
+            pa_type = pa.string() if field.name in text else types[field.name]
+            if field.info.aux.generator.name in DICTIONARY_GENERATORS:
+                pa_type = pa.dictionary(pa.int32(), pa_type)
+            fields[idx] = pa.field(field.name, pa_type)
+        self.pa_schema = pa.schema(fields)
+
+    def compile_csv_options(self):
+        """
+        pyarrow csv options and the header written once per file
+        pyarrow writes utf8, other codecs are transcoded
+        """
+        self._csv_options = pa_csv.WriteOptions(
+            include_header=False, eol=self.linesep
+        )
+        self._csv_transcode = codecs.lookup(self.codec).name != "utf-8"
+        schema = pa.schema([(name, pa.string()) for name in self.header])
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(
+            schema.empty_table(),
+            sink,
+            write_options=pa_csv.WriteOptions(eol=self.linesep),
+        )
+        header = sink.getvalue().to_pybytes()
+        if self._csv_transcode:
+            header = header.decode("utf8").encode(self.codec)
+        self._csv_header = header
 
     def chunk(self):
         """
-        Allow for concurrent generate during write
+        Rows of a single batch
+        set prefetch to generate batches concurrently with consumption
         """
         for _ in range(self.num_rows):
             try:
@@ -270,133 +424,617 @@ class RecordBatchGen:
             except Exception:
                 self.__logger.error("Unknown error in chunk")
 
+    def compile_fwf_layout(self):
+        """
+        Fixed width layout compiled once from the table schema
+        (offset, width, signed) per field, Integer fields are
+        zero padded and signed with an overpunch on the last digit,
+        all other fields are left aligned and space padded.
+        Lookup tables map character codes to single bytes in the codec.
+        """
+        self._fwf_layout = []
+        offset = 0
+        for field in self.table.info.schema.info.fields:
+            width = field.info.length
+            self._fwf_layout.append((offset, width, field.info.type == "Integer"))
+            offset += width
+        self._fwf_width = offset
+
+        self._fwf_table = np.zeros(256, dtype=np.uint8)
+        self._fwf_valid = np.zeros(256, dtype=bool)
+        for code in range(256):
+            try:
+                char = chr(code).encode(self.codec)
+            except UnicodeEncodeError:
+                continue
+            if len(char) == 1:
+                self._fwf_table[code] = char[0]
+                self._fwf_valid[code] = True
+
+        punch = [self.pos_char[str(d)] for d in range(10)]
+        punch += [self.neg_char[str(d)] for d in range(10)]
+        self._fwf_punch = self._fwf_table[[ord(char) for char in punch]]
+
     def fwf_encode_row(self, row):
         record = ""
-        #  Create data of specific unit types.
-        fields = list(self.table.info.schema.fields)
-        for i, dpoint in enumerate(row):
-            # encode
-            # pad to field width
-            # append to record
-            field_schema = fields[i]
-
-            dpoint = str(dpoint)
+        for (_, width, signed), dpoint in zip(self._fwf_layout, row):
+            record += self.fwf_encode_field(dpoint, width, signed)
+        return record
+
+    def fwf_encode_field(self, dpoint, width, signed):
+        # encode
+        # pad to field width
+        # null values are left blank
+        if dpoint is None:
+            dpoint = ""
+            signed = False
+        if signed:
+            try:
+                value = int(dpoint)
+            except (TypeError, ValueError):
+                signed = False
+        if signed:
             # signed integers require encoding
-            # all other fields expected to be string-like
-            if field_schema["utype"] == "int":
-                if dpoint < 0:
-                    # Convert negative integers.
-                    dpoint = dpoint.replace("-", "")
-                    dpoint = dpoint.replace(dpoint[-1], self.neg_char[dpoint[-1:]])
-                else:
-                    # Convert positive integers.
-                    dpoint = dpoint.replace(dpoint[-1], self.pos_char[dpoint[-1:]])
-
-            # ensure generated field is within schema length
-            dpoint = dpoint[: field_schema["length"]]
-
-            # pad up to required length
-            if field_schema["utype"] == "int" or field_schema["utype"] == "uint":
-                dpoint = ("0" * (field_schema["length"] - len(dpoint))) + dpoint
+            # keep the least significant digits
+            digits = str(abs(value))
+            if value < 0:
+                digits = digits[:-1] + self.neg_char[digits[-1]]
             else:
-                dpoint = dpoint + (" " * (field_schema["length"] - len(dpoint)))
+                digits = digits[:-1] + self.pos_char[digits[-1]]
+            return digits[-width:].rjust(width, "0")
+        # ensure generated field is within schema length
+        # pad up to required length
+        return str(dpoint)[:width].ljust(width)
 
-            # append field to record
-            record += dpoint
+    def _fwf_signed_field(self, column, width):
+        """
+        Overpunch encoded digits of an integer column
+        None if a value is not an integer
+        """
+        nulls = None
+        if None in column:
+            nulls = np.array([value is None for value in column])
+            column = [0 if value is None else value for value in column]
+        try:
+            values = np.array(column).astype(np.int64)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        negative = values < 0
+        values = np.abs(values)
+        last = values % 10
+        codes = np.empty((len(values), width), dtype=np.uint8)
+        for pos in range(width - 1, -1, -1):
+            codes[:, pos] = self._fwf_table[ord("0") + values % 10]
+            values //= 10
+        # last digit is the overpunch character, e.g. 1 -> A, -1 -> J
+        codes[:, -1] = self._fwf_punch[last + 10 * negative]
+        if nulls is not None:
+            codes[nulls] = self._fwf_table[ord(" ")]
+        return codes
 
-        return record
+    def _fwf_text_field(self, column, width):
+        """
+        Truncated and space padded text column
+        None if a character is not a single byte in the codec
+        """
+        if None in column:
+            column = ["" if value is None else value for value in column]
+        text = np.array(column, dtype="U%d" % width)
+        codes = text.view(np.uint32).reshape(len(text), width)
+        codes = np.where(codes == 0, ord(" "), codes)
+        if codes.size and (codes.max() > 255 or not self._fwf_valid[codes].all()):
+            return None
+        return self._fwf_table[codes]
+
+    def fwf_encode_batch(self, columns):
+        """
+        Encode a batch column by column into one preallocated buffer
+        a column with multi-byte characters or non-integer values
+        in an Integer field is encoded value by value, fwf_encode_field,
+        multi-byte values widen their records, the slots after them
+        are shifted within the record
+        """
+        nrows = len(columns[0]) if columns else 0
+        cells = []
+        lengths = np.zeros((nrows, len(self._fwf_layout)), dtype=np.int64)
+        for idx, ((_, width, signed), column) in enumerate(
+            zip(self._fwf_layout, columns)
+        ):
+            if width == 0:
+                cells.append(None)
+                continue
+            if signed:
+                codes = self._fwf_signed_field(column, width)
+            else:
+                codes = self._fwf_text_field(column, width)
+            if codes is None:
+                codes, sizes = self._fwf_encoded_field(column, width, signed)
+                if sizes is not None:
+                    cells.append((codes, sizes))
+                    lengths[:, idx] = sizes
+                    continue
+            cells.append(codes)
+            lengths[:, idx] = width
+
+        if (lengths.sum(axis=1) == self._fwf_width).all():
+            data = np.empty((nrows, self._fwf_width), dtype=np.uint8)
+            for (offset, width, _), codes in zip(self._fwf_layout, cells):
+                if codes is not None:
+                    data[:, offset : offset + width] = codes
+            return pa.py_buffer(data)
+
+        # Records of different sizes, slots start after the cells before them
+        sizes = lengths.ravel()
+        starts = (np.cumsum(sizes) - sizes).reshape(lengths.shape)
+        data = np.empty(sizes.sum(), dtype=np.uint8)
+        for idx, ((_, width, _), codes) in enumerate(zip(self._fwf_layout, cells)):
+            if codes is None:
+                continue
+            if isinstance(codes, tuple):
+                codes, cell_sizes = codes
+                first = np.cumsum(cell_sizes) - cell_sizes
+                index = np.repeat(starts[:, idx] - first, cell_sizes)
+                data[index + np.arange(len(codes))] = codes
+            else:
+                data[starts[:, idx, None] + np.arange(width)] = codes
+        return pa.py_buffer(data)
+
+    def _fwf_encoded_field(self, column, width, signed):
+        """
+        Column encoded value by value to the codec
+        Returns the codes in a (rows, width) array when every value
+        is width bytes, otherwise the flat codes and the size of each value
+        """
+        values = [
+            self.fwf_encode_field(value, width, signed).encode(self.codec)
+            for value in column
+        ]
+        codes = np.frombuffer(b"".join(values), dtype=np.uint8)
+        if len(codes) == len(values) * width:
+            return codes.reshape(len(values), width), None
+        return codes, np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+
+    def generate_columns(self):
+        """
+        Columns of a batch in schema order
+        filled record by record, for a given seed the values
+        are those of the row path, Synthesizer.generate
+        column_batches generates column by column with duplicates
+        planned per batch, faster but the values differ from the row path
+        """
+        if self.properties.column_batches and self.synthesizer.columnar:
+            columns = self.synthesizer.generate_batch(self.num_rows)
+            return [columns[name] for name in self.header]
+        columns = self.synthesizer.generate_columns(self.num_rows, self._drain)
+        return [as_column(column, self.num_rows) for column in columns]
 
     def write_batch_fwf(self):
         """
         Generate a batch of records
-        convert rows to fixed width fields
-        encode to ascii format in bytes
+        convert columns to fixed width fields
+        encode to the codec in bytes
         """
-        fwf = io.StringIO()
-        for row in list(self.chunk()):
-            if len(row) != len(self.header):
-                raise ValueError
-            fwf.write(self.fwf_encode_row(row))
-
-        fwf = fwf.getvalue().encode(self.codec)
-        return pa.py_buffer(fwf)
+        return self.fwf_encode_batch(self.generate_columns())
 
     def write_batch_csv(self):
         """
         Generate batch of records
-        encode to csv in bytes
+        encode the columnar batch to csv in bytes,
+        values are written as generated, quoted where needed
         """
-        csv = io.StringIO()
-        if self.header:
-            csv.write(",".join(self.header))
-            csv.write(self.linesep)
-        for row in list(self.chunk()):
-            csv.write(",".join(map(str, row)))
-            csv.write(self.linesep)
-
-        csv = csv.getvalue().encode(self.codec)
-        return pa.py_buffer(csv)
+        arrays = [self._to_text(column) for column in self.generate_columns()]
+        batch = pa.RecordBatch.from_arrays(arrays, names=self.header)
+        sink = pa.BufferOutputStream()
+        sink.write(self._csv_header)
+        pa_csv.write_csv(batch, sink, write_options=self._csv_options)
+        data = sink.getvalue()
+        if self._csv_transcode:
+            data = pa.py_buffer(data.to_pybytes().decode("utf8").encode(self.codec))
+        return data
 
     def write_batch_arrow(self):
         """
         Generate a batch of records
-        convert to pyarrow arrays
+        columnar generation, one buffer per field
         convert to RecordBatch
         """
-        data = list(self.chunk())
-        data = zip(*data)
-        arrays = []
-        for i, column in enumerate(data):
-            arrays.append(pa.array(column, self.pa_schema[i].type))
+        return self.to_record_batch(self.generate_columns())
 
-        batch = pa.RecordBatch.from_arrays(arrays, names=self.pa_schema.names)
-        return batch
-
-    def write_csv(self):
+    def to_record_batch(self, columns):
         """
-        Write n chunks to csv
-        Write file to disk
+        RecordBatch of the columns typed as in pa_schema
         """
-        csv = b""
+        arrays = [
+            self._to_array(column, field)
+            for column, field in zip(columns, self.pa_schema)
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.pa_schema)
 
-        while (len(csv) // 1024 ** 2) < self.maxfilesize:
-            csv += self.write_batch_csv()
-            if self.checkcount():
-                break
-        return csv
+    def _to_text(self, column):
+        """
+        String array of a generated column, e.g. digit strings
+        keep their leading zeros, integers are formatted by Arrow
+        """
+        if column.dtype.kind in "iu":
+            return pa.array(column).cast(pa.string())
+        try:
+            return pa.array(column, type=pa.string())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        return pa.array(
+            [None if value is None else str(value) for value in column],
+            type=pa.string(),
+        )
 
-    def write_fwf(self):
+    def _to_array(self, column, field):
         """
-        Write fwf with all records
+        Typed array for a generated column
+        raises ValueError for a value not convertible to the field type
         """
-        fwf = b""
+        pa_type = field.type
+        encode = pa.types.is_dictionary(pa_type)
+        if encode:
+            pa_type = pa_type.value_type
+        if pa.types.is_string(pa_type):
+            array = self._to_text(column)
+        else:
+            array = self._to_typed(column, field.name, pa_type)
+        if encode:
+            array = array.dictionary_encode()
+        return array
 
-        while (len(fwf) // 1024 ** 2) < self.maxfilesize:
-            fwf += self.write_batch_fwf()
-            if self.checkcount():
-                break
-        return fwf
+    def _to_typed(self, column, name, pa_type):
+        try:
+            return pa.array(column, type=pa_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        # e.g. date strings or digit strings
+        try:
+            return pa.array(column).cast(pa_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return pa.array(
+                [self._to_scalar(value, name, pa_type) for value in column],
+                type=pa_type,
+            )
 
-    def write_recordbatchfile(self):
+    def _to_scalar(self, value, name, pa_type):
+        try:
+            return pa.array([value]).cast(pa_type)[0].as_py()
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            raise ValueError(
+                "Field %s: cannot convert %r to %s" % (name, value, pa_type)
+            )
+
+    def write_batch_parquet(self):
+        """
+        Generate a batch of records
+        encode as a parquet file in bytes
+        """
+        batch = self.write_batch_arrow()
         sink = pa.BufferOutputStream()
-        writer = pa.RecordBatchFileWriter(sink, self.pa_schema)
-
-        batches_size = 0
-        while (batches_size // 1024 ** 2) < self.maxfilesize:
-            batch = self.write_batch_arrow()
-            batches_size += pa.get_record_batch_size(batch)
-            writer.write_batch(batch)
-            if self.checkcount():
+        writer = self._parquet_writer(sink, batch.schema)
+        writer.write_table(
+            pa.Table.from_batches([batch]),
+            row_group_size=self.properties.parquet_row_group_size or None,
+        )
+        writer.close()
+        return sink.getvalue()
+
+    def _parquet_writer(self, sink, schema):
+        """
+        ParquetWriter with configured compression and dictionary encoding
+        column statistics are always written for row group skipping
+        """
+        return pq.ParquetWriter(
+            sink,
+            schema,
+            compression=self.properties.parquet_compression,
+            use_dictionary=self.properties.parquet_dictionary,
+            write_statistics=True,
+        )
+
+    def _open_sink(self, sink, index):
+        """
+        Output stream and path for file index
+        a path may contain a {} placeholder for the file index,
+        otherwise files after the first are suffixed with the index
+        """
+        if isinstance(sink, pa.NativeFile):
+            return sink, None
+        if "{" in sink:
+            path = sink.format(index)
+        elif index == 0:
+            path = sink
+        else:
+            root, ext = os.path.splitext(sink)
+            path = "%s_%d%s" % (root, index, ext)
+        return pa.OSFile(path, "wb"), path
+
+    def _write_files(self, sink, maxfilesize=None, maxrows=None):
+        """
+        Stream the remaining batches to sink
+        a new file is started once the current one
+        reaches maxfilesize (MB) or maxrows records,
+        files are split at batch boundaries
+        sink is a path or a pyarrow NativeFile, no rollover for the latter
+        Parquet row groups are buffered up to parquet_row_group_size rows
+        Returns the paths of the files written, empty for a NativeFile
+        """
+        maxbytes = maxfilesize * 1024 ** 2 if maxfilesize else None
+        rollover = not isinstance(sink, pa.NativeFile)
+        row_group_size = self.properties.parquet_row_group_size
+        files = []
+        nfiles = 0
+        stream = None
+        writer = None
+        row_group = []
+        dictionaries = {}
+        nrows = 0
+
+        def flush(final=False):
+            # Write full row groups, the remainder waits for more batches
+            if not row_group:
+                return
+            table = pa.Table.from_batches(row_group)
+            size = len(table)
+            if row_group_size and not final:
+                size = size // row_group_size * row_group_size
+            writer.write_table(
+                table.slice(0, size), row_group_size=row_group_size or None
+            )
+            row_group[:] = table.slice(size).to_batches()
+
+        for data in self._batches(arrow=self.file_type == 6):
+            if stream is None:
+                stream, path = self._open_sink(sink, nfiles)
+                if path is not None:
+                    files.append(path)
+                nfiles += 1
+                nrows = 0
+                if self.file_type == 5:
+                    dictionaries.clear()
+                    writer = pa.ipc.new_file(
+                        stream,
+                        self.pa_schema,
+                        options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True),
+                    )
+                elif self.file_type == 6:
+                    writer = self._parquet_writer(stream, data.schema)
+                elif self.file_type == 1:
+                    stream.write(self._csv_header)
+
+            if self.file_type == 5:
+                writer.write_batch(self._unify_dictionaries(data, dictionaries))
+                nrows += data.num_rows
+            elif self.file_type == 6:
+                row_group.append(data)
+                nrows += data.num_rows
+                if sum(batch.num_rows for batch in row_group) >= row_group_size:
+                    flush()
+            else:
+                if self.file_type == 1:
+                    # Header is written once per file
+                    data = data.slice(len(self._csv_header))
+                stream.write(data)
+                nrows += self.num_rows
+
+            if rollover and (
+                (maxbytes and stream.tell() >= maxbytes)
+                or (maxrows and nrows >= maxrows)
+            ):
+                if writer is not None:
+                    flush(final=True)
+                    writer.close()
+                    writer = None
+                stream.close()
+                stream = None
+
+        if writer is not None:
+            flush(final=True)
+            writer.close()
+        if rollover and stream is not None:
+            stream.close()
+        self.__logger.info("Wrote %d files", nfiles)
+        return files
+
+    def _unify_dictionaries(self, batch, dictionaries):
+        """
+        Arrow files allow a single dictionary per field, extended by deltas
+        Batches are encoded independently, remap their indices onto
+        one dictionary per field that only grows within a file
+        """
+        arrays = batch.columns
+        for i, array in enumerate(arrays):
+            if not pa.types.is_dictionary(array.type):
+                continue
+            codes, values = dictionaries.setdefault(i, ({}, []))
+            mapping = np.empty(len(array.dictionary), dtype=np.int32)
+            for j, value in enumerate(array.dictionary.to_pylist()):
+                if value not in codes:
+                    codes[value] = len(values)
+                    values.append(value)
+                mapping[j] = codes[value]
+            indices = array.indices.fill_null(0).to_numpy()
+            mask = array.is_null().to_numpy(zero_copy_only=False)
+            arrays[i] = pa.DictionaryArray.from_arrays(
+                pa.array(mapping[indices], mask=mask),
+                pa.array(values, type=array.type.value_type),
+            )
+        return pa.RecordBatch.from_arrays(arrays, schema=batch.schema)
+
+    def write_csv(self, sink, maxfilesize=None, maxrows=None):
+        """
+        Stream csv batches to file
+        with a single header per file
+        """
+        if self.file_type != 1:
+            raise ValueError("Generator file_type %d is not csv" % self.file_type)
+        return self._write_files(sink, maxfilesize, maxrows)
+
+    def write_fwf(self, sink, maxfilesize=None, maxrows=None):
+        """
+        Stream fwf batches to file
+        """
+        if self.file_type != 2:
+            raise ValueError("Generator file_type %d is not fwf" % self.file_type)
+        return self._write_files(sink, maxfilesize, maxrows)
+
+    def write_parquet(self, sink, maxfilesize=None, maxrows=None):
+        """
+        Stream RecordBatches as row groups to Parquet files
+        """
+        if self.file_type != 6:
+            raise ValueError("Generator file_type %d is not parquet" % self.file_type)
+        return self._write_files(sink, maxfilesize, maxrows)
+
+    def write_recordbatchfile(self, sink, maxfilesize=None, maxrows=None):
+        """
+        Stream RecordBatches to Arrow files
+        """
+        if self.file_type != 5:
+            raise ValueError("Generator file_type %d is not arrow" % self.file_type)
+        return self._write_files(sink, maxfilesize, maxrows)
+
+    def batch_seed(self, idx):
+        """
+        Seed for batch idx derived from the base seed
+        independent of the number of workers
+        """
+        seq = np.random.SeedSequence([self._base_seed, idx])
+        return int(seq.generate_state(1)[0])
+
+    def generate_batch(self, idx):
+        """
+        Regenerate batch idx without generating the batches before it
+        Returns the same data as the idx-th call to next
+        Requires a seed, seekable or workers, batches are then seeded
+        by index, record ids start at idx * num_rows and duplicates
+        do not cross batch boundaries
+        Not available while batches are prefetched by a thread
+        """
+        if not self._per_batch_seed:
+            raise ValueError("generate_batch requires a seekable generator")
+        if idx < 0:
+            raise ValueError("Batch index must not be negative")
+        # The prefetch thread generates with the same synthesizer
+        if self._executor is not None and self.workers == 0:
+            raise ValueError("generate_batch while prefetching, close first")
+        return self._produce(idx)
+
+    def _produce(self, idx, arrow=False):
+        """
+        Generate and encode batch idx
+        arrow returns the RecordBatch before encoding
+        """
+        if self._per_batch_seed:
+            self.synthesizer.reset(idx=idx * self.num_rows, seed=self.batch_seed(idx))
+        # Batches seeded by index hold all their duplicates,
+        # otherwise duplicates are carried over until the last batch
+        self._drain = self._per_batch_seed or idx == self._nbatches - 1
+        if arrow:
+            return self.write_batch_arrow()
+        return self.write_batch()
+
+    def close(self):
+        """
+        Shutdown the background workers, discarding batches not yet consumed
+        """
+        while self._pending:
+            self._pending.pop().cancel()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _start_executor(self):
+        """
+        Process pool when workers are requested,
+        otherwise a single thread generating batches in order
+        """
+        if self.workers > 0:
+            options = dict(self._options)
+            options.update(seed=self._base_seed, workers=0, prefetch=0)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.name, options),
+            )
+            self._produce_fn = _produce_in_worker
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            self._produce_fn = self._produce
+
+    def _next_prefetched(self, arrow=False):
+        """
+        Keep up to depth batches generating and encoding in the background
+        and return them in batch order
+        The bounded window caps memory at depth batches
+        """
+        if self._executor is None:
+            self._start_executor()
+        while len(self._pending) < self._depth:
+            try:
+                idx = next(self._batch_iter)
+            except StopIteration:
                 break
+            self._pending.append(self._executor.submit(self._produce_fn, idx, arrow))
 
-        writer.close()
-        buf = sink.getvalue()
-        return buf
+        if not self._pending:
+            self.close()
+            raise StopIteration
+        data = self._pending.popleft().result()
+        if self.workers > 0:
+            data, pid, metrics = data
+            self._worker_metrics[pid] = metrics
+        return data
 
-    def __next__(self):
-        next(self._batch_iter)
-        self.__logger.info("%s: Generating datum " % (self.__class__.__name__))
-        data = self.write_batch()
+    def _next_batch(self, arrow=False):
+        if self._depth > 0:
+            data = self._next_prefetched(arrow)
+        else:
+            idx = next(self._batch_iter)
+            self.__logger.debug("%s: Generating datum", self.__class__.__name__)
+            data = self._produce(idx, arrow)
 
         self._batchidx += 1
         return data
+
+    def _batches(self, arrow=False):
+        """
+        Remaining batches, encoded or as RecordBatches
+        """
+        while True:
+            try:
+                yield self._next_batch(arrow)
+            except StopIteration:
+                return
+
+    def __next__(self):
+        return self._next_batch()
+
+    def snapshot(self):
+        """
+        Metrics of the records generated so far, see Synthesizer.snapshot
+        summed over the worker processes
+        """
+        snapshots = [self.synthesizer.snapshot()]
+        snapshots.extend(self._worker_metrics.values())
+        return Synthesizer.merge_snapshots(snapshots)
+
+
+# Generator instance owned by each worker process
+_worker_generator = None
+
+
+def _init_worker(name, options):
+    global _worker_generator
+    _worker_generator = RecordBatchGen(name, **options)
+    _worker_generator._per_batch_seed = True
+    _worker_generator.initialize()
+
+
+def _produce_in_worker(idx, arrow=False):
+    """
+    Batch idx with the process id and metrics of the worker
+    """
+    data = _worker_generator._produce(idx, arrow)
+    return data, os.getpid(), _worker_generator.synthesizer.snapshot()
@@ -60,8 +60,8 @@ Requires suitable dictionaries for generating proper Canadian addresses.
 Requires dictionary of commonly mispelled words (with list of misspellings).
 This will also serve well for the Postal data.
 
-Require a way to select from a probability distribution:
-https://eli.thegreenplace.net/2010/01/22/weighted-random-generation-python
+Fields and modifications are selected with alias tables,
+see dolos.simutable.sampler
 
 FEBRLGEN Comments
 All fields the following keys must be given:
@@ -105,7 +105,116 @@ import string
 import logging
 from pprint import pformat
 
+import numpy as np
+import pyarrow as pa
+
 from artemis_base.utils.logger import Logger
+from dolos.simutable.misspelling import MisspellingTable
+from dolos.simutable.providers import numpy_rng
+from dolos.simutable.sampler import AliasSampler
+
+# Characters drawn for digits, letters and anything else
+CHARACTER_RANGES = (
+    string.digits,
+    string.ascii_lowercase,
+    string.ascii_lowercase + string.digits,
+)
+CHARACTER_CODES = tuple(
+    np.frombuffer(chars.encode("utf-32-le"), dtype=np.uint32)
+    for chars in CHARACTER_RANGES
+)
+
+# Modifications applied as array edits in modify_columns
+CHARACTER_MODIFICATIONS = ("insert", "delete", "substitute", "transpose")
+
+# Neighbouring keys in the same keyboard row and column for letters
+# and digits, from FEBRL dsgen (based on ideas implemented by
+# Mauricio A. Hernandez in his dbgen)
+KEYBOARD_ROWS = {
+    "a": "s",
+    "b": "vn",
+    "c": "xv",
+    "d": "sf",
+    "e": "wr",
+    "f": "dg",
+    "g": "fh",
+    "h": "gj",
+    "i": "uo",
+    "j": "hk",
+    "k": "jl",
+    "l": "k",
+    "m": "n",
+    "n": "bm",
+    "o": "ip",
+    "p": "o",
+    "q": "w",
+    "r": "et",
+    "s": "ad",
+    "t": "ry",
+    "u": "yi",
+    "v": "cb",
+    "w": "qe",
+    "x": "zc",
+    "y": "tu",
+    "z": "x",
+    "1": "2",
+    "2": "13",
+    "3": "24",
+    "4": "35",
+    "5": "46",
+    "6": "57",
+    "7": "68",
+    "8": "79",
+    "9": "80",
+    "0": "9",
+}
+
+KEYBOARD_COLS = {
+    "a": "qzw",
+    "b": "gh",
+    "c": "df",
+    "d": "erc",
+    "e": "d",
+    "f": "rvc",
+    "g": "tbv",
+    "h": "ybn",
+    "i": "k",
+    "j": "umn",
+    "k": "im",
+    "l": "o",
+    "m": "jk",
+    "n": "hj",
+    "o": "l",
+    "p": "p",
+    "q": "a",
+    "r": "f",
+    "s": "wxz",
+    "t": "gf",
+    "u": "j",
+    "v": "fg",
+    "w": "s",
+    "x": "sd",
+    "y": "h",
+    "z": "as",
+}
+
+
+def compile_keyboard(neighbours):
+    """
+    Lookup arrays of neighbouring keys indexed by character code,
+    code points of the neighbours padded with 0 and their number
+    """
+    width = max(len(keys) for keys in neighbours.values())
+    table = np.zeros((128, width), dtype=np.uint32)
+    counts = np.zeros(128, dtype=np.int64)
+    for key, keys in neighbours.items():
+        table[ord(key), : len(keys)] = [ord(k) for k in keys]
+        counts[ord(key)] = len(keys)
+    return table, counts
+
+
+KEYBOARD_ROW_TABLE, KEYBOARD_ROW_COUNTS = compile_keyboard(KEYBOARD_ROWS)
+KEYBOARD_COL_TABLE, KEYBOARD_COL_COUNTS = compile_keyboard(KEYBOARD_COLS)
 
 
 @Logger.logged
@@ -115,17 +224,21 @@ class Modifier(object):
 
     """
 
-    def __init__(self, fake, generators, schema, modifiers):
+    def __init__(
+        self, fake, generators, schema, modifiers, misspellings=None, field_swaps=None
+    ):
         """
         Requires frequencies for field modification
         Requires modification probabilities
         Pass tuple of lists or list
+        misspellings maps field names to a MisspellingTable
+        or the path of one
+        field_swaps maps pairs of field names to the probability
+        of exchanging their values in a record
         """
         # Fixed probabilities
-        print("Modifier init")
         self.__logger = logging.getLogger(__name__)
         self.__logger.info("Modifier init")
-        self.__logger.debug("DEBUG Message")
         self.single_typo_prob = {"same_row": 0.40, "same_col": 0.30}
 
         # Additional dictionaries required
@@ -133,6 +246,7 @@ class Modifier(object):
         # field_swap_prob = {('address_1', 'address_2'):0.02,
         #                    ('given_name', 'surname'):0.05,
         #                    ('postcode', 'suburb'):0.01}
+        # given as field_swaps, the record_modifier message has no field
 
         self.max_modifications_in_record = modifiers.max_modifications_in_record
         self.max_field_modifiers = modifiers.max_field_modifiers
@@ -163,54 +277,96 @@ class Modifier(object):
             "merge": 0,
             "nullify": 0,
             "fill": 0,
+            "field_swap": 0,
         }
 
         self.generator_fcns = generators
         self.num_mods_in_record = 0
         self.field_mod_count = {}
+        # Number of modifications applied per field
+        self.field_counters = {}
 
         self.fake = fake
-        self.randcntr = 0
         self.schema = schema
         self.modifiers = OrderedDict()
+        self.misspellings = {}
+        for name, table in (misspellings or {}).items():
+            if isinstance(table, str):
+                table = MisspellingTable(table)
+            self.misspellings[name] = table
 
         for field in modifiers.fields:
             probabilities = {}
             for x, y in field.probabilities.ListFields():
-                if x.name == "misspell":
-                    continue
                 probabilities[x.name] = round(y, 4)
             self.modifiers[field.name] = {
                 "select": field.selection,
                 "probabilities": probabilities,
             }
-        self.prob_fields = []
-        self.prob_modifiers = OrderedDict({})
         self.pos_fields = {}
-        prob_sum = 0.0
-        for key in self.modifiers:
-            self.prob_fields.append((key, prob_sum))
-            prob_sum += self.modifiers[key]["select"]
-
-        prob_sum = 0.0
-        self.__logger.debug("Creating CDF for modifiers")
-        for key in self.modifiers:
-            self.prob_modifiers[key] = []
-            prob_sum = 0.0
-            for name in self.modifiers[key]["probabilities"]:
-                self.prob_modifiers[key].append((name, prob_sum))
-                prob_sum += self.modifiers[key]["probabilities"][name]
+        self.__logger.debug("Creating alias tables for modifiers")
+        self.field_sampler = self._sampler(
+            {key: self.modifiers[key]["select"] for key in self.modifiers}
+        )
+        self.modifier_samplers = {
+            key: self._sampler(self.modifiers[key]["probabilities"])
+            for key in self.modifiers
+        }
 
         for pos, key in enumerate(self.schema):
             for field in self.modifiers:
                 if key == field:
                     self.pos_fields[key] = int(pos)
                     self.field_mod_count[key] = 0
+                    self.field_counters[key] = 0
+
+        self.field_swaps = []
+        for (left, right), prob in (field_swaps or {}).items():
+            self.field_swaps.append(self.compile_swap(left, right, prob))
         self.__logger.info("Modifier configured")
 
+    def text_fields(self):
+        """
+        Fields with character or word modifications,
+        their modified values are strings whatever the field type
+        """
+        typed = {"nullify", "replace", "fill"}
+        return [
+            name
+            for name, modifier in self.modifiers.items()
+            if any(
+                prob > 0 and key not in typed
+                for key, prob in modifier["probabilities"].items()
+            )
+        ]
+
+    def compile_swap(self, left, right, prob):
+        """
+        Resolve the positions of a field pair once,
+        fields are added to pos_fields
+        Returns (left, right, left position, right position, probability)
+        """
+        for name in (left, right):
+            if name not in self.schema:
+                raise ValueError("Cannot swap unknown field %s" % name)
+        if not 0.0 <= prob <= 1.0:
+            raise ValueError("Swap probability of %s, %s not in [0, 1]" % (left, right))
+        for name in (left, right):
+            self.pos_fields.setdefault(name, self.schema.index(name))
+        return (left, right, self.pos_fields[left], self.pos_fields[right], prob)
+
+    def snapshot(self):
+        """
+        Modification counters per type and per field
+        """
+        return {
+            "modifications": dict(self.counters),
+            "fields": dict(self.field_counters),
+        }
+
     def get_stats(self):
         self.__logger.info("Modifier Statistics")
-        self.__logger.info(pformat(self.counters))
+        self.__logger.info(pformat(self.snapshot()))
 
     def reset_fake(self, fake):
         self.fake = None
@@ -230,31 +386,18 @@ class Modifier(object):
         for key in self.field_mod_count:
             self.field_mod_count[key] = 0
 
-    def field_pdf(self):
-        """
-        Create a map of duplicates and probabilities
-        according to a pdf, i.e. uniform
-        and store for re-use on each original event
-        current version taken directly from FEBRL
-        needs review b/c number of duplicates stored starts at 2?
-        """
-        num_dup = 1
-        prob_sum = 0.0
-        prob_list = [(num_dup, prob_sum)]
-        max_dups = self.duplicate_cfg["Max_duplicate"]
-        uniform_val = 1.0 / float(max_dups)
-        self.__logger.debug("Maximum number of duplicatesi %d", max_dups)
-        for i in range(max_dups - 1):
-            num_dup += 1
-            prob_list.append((num_dup, uniform_val + prob_list[-1][1]))
-        return prob_list
-
-    def random_select(self, prob):
-        ind = -1
-        while prob[ind][1] > self.fake.random.random():
-            ind -= 1
-            self.randcntr += 1
-        return prob[ind][0]
+    @staticmethod
+    def _sampler(probabilities):
+        """
+        Alias table for a dictionary of name, probability
+        None if nothing can be selected
+        """
+        if sum(probabilities.values()) <= 0:
+            return None
+        return AliasSampler(list(probabilities), list(probabilities.values()))
+
+    def random_select(self, sampler):
+        return sampler.draw(self.fake.random)
 
     def modify(self, row):
         """
@@ -269,12 +412,15 @@ class Modifier(object):
         selects modification according to pdf
         apply modifications in field
         """
-        while self.num_mods_in_record < self.max_record_modifiers:
-            field = self.random_select(self.prob_fields)
+        while (
+            self.field_sampler is not None
+            and self.num_mods_in_record < self.max_record_modifiers
+        ):
+            field = self.random_select(self.field_sampler)
 
             # continue selecting new field if max modifications reached
             while self.field_mod_count[field] == self.max_field_modifiers:
-                field = self.random_select(self.prob_fields)
+                field = self.random_select(self.field_sampler)
 
             pos = self.pos_fields[field]
             if self.max_field_modifiers == 1:
@@ -290,20 +436,270 @@ class Modifier(object):
                 row[pos] = self._modify(field, row[pos])
                 self.field_mod_count[field]
                 self.num_mods_in_record += 1
+        self.swap_fields(row)
         self._reset()
 
+    def swap_fields(self, row):
+        """
+        Exchange the values of each field pair with its probability
+        """
+        for _, _, left, right, prob in self.field_swaps:
+            if self.fake.random.random() < prob:
+                row[left], row[right] = row[right], row[left]
+                self.counters["field_swap"] += 1
+
+    def swap_columns(self, columns, rows):
+        """
+        Exchange the values of each field pair in the records
+        at positions rows of a batch of numpy columns, for a random mask
+        Columns of different dtypes are converted to object arrays
+        """
+        rng = numpy_rng(self.fake)
+        for left, right, _, _, prob in self.field_swaps:
+            if left not in columns or right not in columns:
+                continue
+            swapped = rows[rng.random(len(rows)) < prob]
+            if columns[left].dtype != columns[right].dtype:
+                columns[left] = columns[left].astype(object)
+                columns[right] = columns[right].astype(object)
+            left_values = columns[left][swapped]
+            columns[left][swapped] = columns[right][swapped]
+            columns[right][swapped] = left_values
+            self.counters["field_swap"] += len(swapped)
+
     def _modify(self, field, value):
         """
         determine whether to modify a field in a row
         select modification
         apply modification
         """
-        self.__logger.debug("_modify")
-        self.__logger.debug("%s" % self.prob_modifiers[field])
-        modifier = self.random_select(self.prob_modifiers[field])
-        self.__logger.info("Modifier: %s" % modifier)
+        if self.modifier_samplers[field] is None:
+            return value
+        modifier = self.random_select(self.modifier_samplers[field])
+        if value is None and modifier != "fill":
+            return value
+        self.field_counters[field] += 1
         return self.modification_fcns[modifier](field, value)
 
+    def plan_batch(self, nrows, fields=None):
+        """
+        Draw the modifications of nrows records at once
+        Same scheme as modify, a field is selected
+        and modified one or more times until each record
+        has max_record_modifiers modifications
+        Returns arrays of record, field, modification and step,
+        the order in which modifications of a record are applied.
+        Fields index field_sampler.values,
+        modifications index the keys of modification_fcns
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if self.field_sampler is None or nrows <= 0:
+            return empty, empty, empty, empty
+        rng = numpy_rng(self.fake)
+        remaining = np.full(nrows, self.max_record_modifiers, dtype=np.int64)
+        records = []
+        selected = []
+        while True:
+            active = np.flatnonzero(remaining > 0)
+            if len(active) == 0:
+                break
+            field = self.field_sampler.draw_index_batch(rng, len(active))
+            if self.max_field_modifiers == 1:
+                nmods = np.ones(len(active), dtype=np.int64)
+            else:
+                nmods = rng.integers(1, self.max_field_modifiers + 1, len(active))
+            nmods = np.minimum(nmods, remaining[active])
+            remaining[active] -= nmods
+            records.append(np.repeat(active, nmods))
+            selected.append(np.repeat(field, nmods))
+        if not records:
+            return empty, empty, empty, empty
+
+        records = np.concatenate(records)
+        selected = np.concatenate(selected)
+        order = np.argsort(records, kind="stable")
+        records = records[order]
+        selected = selected[order]
+        steps = np.arange(len(records)) - np.searchsorted(records, records)
+
+        codes = {name: code for code, name in enumerate(self.modification_fcns)}
+        modifications = np.full(len(records), -1, dtype=np.int64)
+        for findex, name in enumerate(self.field_sampler.values):
+            sampler = self.modifier_samplers[name]
+            mask = selected == findex
+            if sampler is None or not mask.any():
+                continue
+            lookup = np.array([codes[value] for value in sampler.values])
+            modifications[mask] = lookup[sampler.draw_index_batch(rng, mask.sum())]
+
+        keep = modifications >= 0
+        if fields is not None:
+            allowed = [
+                findex
+                for findex, name in enumerate(self.field_sampler.values)
+                if name in fields
+            ]
+            keep &= np.isin(selected, allowed)
+        return records[keep], selected[keep], modifications[keep], steps[keep]
+
+    def modify_batch(self, batch):
+        """
+        Modify all records of a RecordBatch, see modify_columns
+        Swapped field pairs must have the same type
+        Returns a RecordBatch with the modified columns replaced
+        """
+        schema = batch.schema
+        for left, right, _, _, _ in self.field_swaps:
+            if left not in schema.names or right not in schema.names:
+                continue
+            if schema.field(left).type != schema.field(right).type:
+                raise ValueError(
+                    "Cannot swap %s and %s of different types" % (left, right)
+                )
+        names = [name for name in self.pos_fields if name in schema.names]
+        columns = {}
+        for name in names:
+            column = batch.column(schema.get_field_index(name))
+            columns[name] = np.fromiter(
+                column.to_pylist(), dtype=object, count=len(column)
+            )
+        self.modify_columns(columns, np.arange(batch.num_rows))
+        arrays = list(batch.columns)
+        for name in names:
+            idx = schema.get_field_index(name)
+            arrays[idx] = pa.array(columns[name], type=schema.field(name).type)
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def modify_columns(self, columns, rows):
+        """
+        Modify the records at positions rows of a batch in place
+        columns maps field names to numpy arrays,
+        e.g. Synthesizer.generate_batch
+        Modifications are planned for all records at once,
+        then applied per field, modification and step:
+        character edits of strings are done on a code point array
+        of the selected values, other modifications per value.
+        Null values are skipped except by fill, as in modify
+        Field pairs are then swapped with masked exchanges
+        Modified columns are replaced with object arrays
+        """
+        names = [name for name in self.pos_fields if name in columns]
+        records, fields, modifications, steps = self.plan_batch(len(rows), names)
+        if len(records) == 0:
+            self.swap_columns(columns, rows)
+            return
+        modifiers = list(self.modification_fcns)
+        for findex, name in enumerate(self.field_sampler.values):
+            in_field = fields == findex
+            if not in_field.any():
+                continue
+            values = columns[name][rows].astype(object)
+            field_steps = steps[in_field]
+            field_records = records[in_field]
+            field_modifications = modifications[in_field]
+            for step in range(int(field_steps.max()) + 1):
+                at_step = field_steps == step
+                for code in np.unique(field_modifications[at_step]).tolist():
+                    modifier = modifiers[code]
+                    selected = field_records[at_step & (field_modifications == code)]
+                    if modifier != "fill":
+                        selected = selected[np.not_equal(values[selected], None)]
+                    self.field_counters[name] += len(selected)
+                    is_string = np.array(
+                        [isinstance(value, str) for value in values[selected]],
+                        dtype=bool,
+                    )
+                    if modifier in CHARACTER_MODIFICATIONS and is_string.any():
+                        self.edit_characters(values, selected[is_string], modifier)
+                        selected = selected[~is_string]
+                    if modifier == "nullify":
+                        self.counters["nullify"] += len(selected)
+                        values[selected] = None
+                        continue
+                    fcn = self.modification_fcns[modifier]
+                    for record in selected.tolist():
+                        values[record] = fcn(name, values[record])
+            column = columns[name]
+            if column.dtype != object:
+                column = column.astype(object)
+            column[rows] = values
+            columns[name] = column
+        self.swap_columns(columns, rows)
+
+    def edit_characters(self, values, rows, modifier):
+        """
+        Apply a character modification to the strings values[rows]
+        on an array of code points, one row per value
+        Positions are drawn as in select_position
+        """
+        rng = numpy_rng(self.fake)
+        self.counters[modifier] += len(rows)
+        if len(rows) == 0:
+            return
+        strings = np.array(values[rows].tolist(), dtype=str)
+        lengths = np.char.str_len(strings)
+        offset = {"insert": 1, "delete": 0, "substitute": 0, "transpose": -1}[modifier]
+        minimum = {"insert": 0, "delete": 1, "substitute": 1, "transpose": 2}[modifier]
+        valid = lengths >= minimum
+        if not valid.any():
+            return
+        rows = rows[valid]
+        strings = strings[valid]
+        lengths = lengths[valid]
+
+        width = max(int(strings.dtype.itemsize // 4), 1)
+        codes = strings.astype("U%d" % width).view(np.uint32)
+        chars = np.zeros((len(rows), width + 1), dtype=np.uint32)
+        chars[:, :width] = codes.reshape(len(rows), width)
+        mid = (lengths + offset) / 2.0 + 1
+        pos = np.maximum(0, np.round(rng.normal(mid, 1.0))).astype(np.int64)
+        pos = np.minimum(pos, np.maximum(lengths - 1 + offset, 0))
+        index = np.arange(width + 1)
+        nrows = np.arange(len(rows))[:, None]
+
+        if modifier == "insert":
+            source = np.clip(index - (index > pos[:, None]), 0, width)
+            chars = chars[nrows, source]
+            kinds = self.character_kinds(strings)
+            chars[np.arange(len(rows)), pos] = self.random_characters(rng, kinds)
+            lengths = lengths + 1
+        elif modifier == "delete":
+            source = np.clip(index + (index >= pos[:, None]), 0, width)
+            chars = chars[nrows, source]
+            lengths = lengths - 1
+        elif modifier == "substitute":
+            kinds = self.character_kinds(strings)
+            chars[np.arange(len(rows)), pos] = self.error_characters(
+                rng, chars[np.arange(len(rows)), pos], kinds
+            )
+        else:
+            left = chars[np.arange(len(rows)), pos]
+            chars[np.arange(len(rows)), pos] = chars[np.arange(len(rows)), pos + 1]
+            chars[np.arange(len(rows)), pos + 1] = left
+
+        chars[index >= lengths[:, None]] = 0
+        chars = np.ascontiguousarray(chars)
+        edited = chars.view("U%d" % (width + 1)).ravel()
+        values[rows] = edited.tolist()
+
+    def character_kinds(self, strings):
+        """
+        Index of the character_range of each value of a string array
+        """
+        is_digit = np.char.isdigit(strings)
+        is_alpha = np.char.isalpha(strings)
+        return np.where(is_digit, 0, np.where(is_alpha, 1, 2))
+
+    def random_characters(self, rng, kinds):
+        """
+        Draw one code point per value from the character range of its kind
+        """
+        codes = np.zeros(len(kinds), dtype=np.uint32)
+        for kind, table in enumerate(CHARACTER_CODES):
+            mask = kinds == kind
+            codes[mask] = table[rng.integers(0, len(table), int(mask.sum()))]
+        return codes
+
     def character_range(self, data):
         """
         FEBRL defines the character type in the original configuration
@@ -313,17 +709,16 @@ class Modifier(object):
         in the future we likely want proper data types
         """
         if data.isdigit():
-            return string.digits
+            return CHARACTER_RANGES[0]
         elif data.isalpha():
-            return string.digits + string.ascii_lowercase
+            return CHARACTER_RANGES[1]
         else:
-            return string.ascii_lowercase
+            return CHARACTER_RANGES[2]
 
     def insert(self, field, data):
         """
         insert single character according to type
         """
-        self.__logger.debug("insert")
         self.counters["insert"] += 1
         pos = self.select_position(data, +1)
         char_range = self.character_range(data)
@@ -339,7 +734,6 @@ class Modifier(object):
         return value
 
     def delete(self, field, data):
-        self.__logger.debug("delete")
         self.counters["delete"] += 1
         pos = self.select_position(data, 0)
         value = data[:pos] + data[pos + 1 :]
@@ -349,7 +743,6 @@ class Modifier(object):
         """
         substitute random character
         """
-        self.__logger.debug("substitute")
         self.counters["substitute"] += 1
         pos = self.select_position(data, 0)
         char_range = self.character_range(data)
@@ -358,22 +751,34 @@ class Modifier(object):
             return data
         else:
             char = self.error_character(data[pos], char_range)
-            value = data[:pos] + char + data[pos:]
+            value = data[:pos] + char + data[pos + 1 :]
         return value
 
     def misspell(self, field, data):
         """
         Dictionary of commonly misspelled words
+        Replace the value with one of its misspellings, otherwise
+        a word of the value, unchanged without a dictionary entry
         """
-        self.__logger.debug("misspell")
         self.counters["misspell"] += 1
-        return "Blah"
+        table = self.misspellings.get(field)
+        if table is None:
+            return data
+        value = table.choice(data, self.fake.random)
+        if value is not None:
+            return value
+        words = data.split(" ")
+        candidates = [pos for pos, word in enumerate(words) if word in table]
+        if not candidates:
+            return data
+        pos = self.fake.random.choice(candidates)
+        words[pos] = table.choice(words[pos], self.fake.random)
+        return " ".join(words)
 
     def transpose(self, field, data):
         """
         transpose two characters
         """
-        self.__logger.debug("transpose")
         self.counters["transpose"] += 1
         if len(data) == 1:
             return data
@@ -388,21 +793,15 @@ class Modifier(object):
         """
         replace
         """
-        self.__logger.debug("replace")
         self.counters["replace"] += 1
         # TODO
         # Implement random generation of dependent values?
-        if self.generator_fcns[field][1] is None:
-            value = self.generator_fcns[field][0]()
-            return value
-        else:
-            return self.generator_fcns[field][0](self.generator_fcns[field][1])
+        return self.generate_value(field)
 
     def swap(self, field, data):
         """
         swap -- randomly swap two words if field has at least two words
         """
-        self.__logger.debug("swap")
         self.counters["swap"] += 1
         words = data.split(" ")
         nwords = len(words)
@@ -420,7 +819,6 @@ class Modifier(object):
         """
         split word
         """
-        self.__logger.debug("split")
         self.counters["split"] += 1
         if len(data) > 1:
             pos = self.select_position(data, 0)
@@ -433,7 +831,6 @@ class Modifier(object):
         """
         merge one or more words
         """
-        self.__logger.debug("merge")
         self.counters["merge"] += 1
 
         nspaces = field.count(" ")
@@ -455,7 +852,6 @@ class Modifier(object):
         """
         random null value
         """
-        self.__logger.debug("nullify")
         self.counters["nullify"] += 1
         return None
 
@@ -463,13 +859,20 @@ class Modifier(object):
         """
         fill
         """
-        self.__logger.debug("fill")
         self.counters["fill"] += 1
-        if self.generator_fcns[field][1] is None:
-            value = self.generator_fcns[field][0]()
-            return value
-        else:
-            return self.generator_fcns[field][0](self.generator_fcns[field][1])
+        return self.generate_value(field)
+
+    def generate_value(self, field):
+        """
+        New value of a field from its generator
+        with the parameters passed as in Synthesizer.bind
+        """
+        fake, parms = self.generator_fcns[field]
+        if parms is None:
+            return fake()
+        if isinstance(parms, list) and getattr(fake, "positional", False):
+            return fake(*parms)
+        return fake(parms)
 
     def select_position(self, input_string, len_offset):
         """
@@ -500,168 +903,59 @@ class Modifier(object):
         return min(random_pos, max_return_pos)
 
     def error_character(self, input_char, char_range):
-
         """
         A function which returns a character created randomly. It uses row and
         column keyboard dictionaires.
         Directly taken from FEBRL dsgen
+        With probability same_row a neighbouring key in the same row,
+        same_col a neighbouring key in the same column (not for digits),
+        otherwise or without neighbours a random character of char_range
         """
-        # Keyboard substitutions gives two dictionaries
-        # with the neigbouring keys for
-        # all letters both for rows and columns (based on ideas implemented by
-        # Mauricio A. Hernandez in his dbgen).
-
-        rows = {
-            "a": "s",
-            "b": "vn",
-            "c": "xv",
-            "d": "sf",
-            "e": "wr",
-            "f": "dg",
-            "g": "fh",
-            "h": "gj",
-            "i": "uo",
-            "j": "hk",
-            "k": "jl",
-            "l": "k",
-            "m": "n",
-            "n": "bm",
-            "o": "ip",
-            "p": "o",
-            "q": "w",
-            "r": "et",
-            "s": "ad",
-            "t": "ry",
-            "u": "yi",
-            "v": "cb",
-            "w": "qe",
-            "x": "zc",
-            "y": "tu",
-            "z": "x",
-            "1": "2",
-            "2": "13",
-            "3": "24",
-            "4": "35",
-            "5": "46",
-            "6": "57",
-            "7": "68",
-            "8": "79",
-            "9": "80",
-            "0": "9",
-        }
-
-        cols = {
-            "a": "qzw",
-            "b": "gh",
-            "c": "df",
-            "d": "erc",
-            "e": "d",
-            "f": "rvc",
-            "g": "tbv",
-            "h": "ybn",
-            "i": "k",
-            "j": "umn",
-            "k": "im",
-            "l": "o",
-            "m": "jk",
-            "n": "hj",
-            "o": "l",
-            "p": "p",
-            "q": "a",
-            "r": "f",
-            "s": "wxz",
-            "t": "gf",
-            "u": "j",
-            "v": "fg",
-            "w": "s",
-            "x": "sd",
-            "y": "h",
-            "z": "as",
-        }
-        # Create a random number between 0 and 1
         rand_num = self.fake.random.random()
-
-        if char_range == "digit":
-            # Randomly chosen neigbouring key in the same keyboard row
-            if (input_char.isdigit()) and (
-                rand_num <= self.single_typo_prob["same_row"]
-            ):
-                output_char = self.fake.random.choice(rows[input_char])
-            else:
-                # TODO following line not understood in original implementation
-                # choice_str =  string.replace(string.digits, input_char, '')
-                # A randomly choosen digit
-                output_char = self.fake.random.choice(string.digit)
-        elif char_range == "alpha":
-            # A randomly chosen neigbouring key in the same keyboard row
-            if (input_char.isalpha()) and (
-                rand_num <= self.single_typo_prob["same_row"]
-            ):
-                output_char = self.fake.random.choice(rows[input_char])
-
-            # A randomly chosen neigbouring key in the same keyboard column
-            elif (input_char.isalpha()) and (
-                rand_num
-                <= (
-                    self.single_typo_prob["same_row"]
-                    + self.single_typo_prob["same_col"]
-                )
-            ):
-                output_char = self.fake.random.choice(cols[input_char])
-
-            else:
-                # TODO Following line not understood in original implementation
-                # Just do choice of character set
-                # choice_str = string.replace(string.lowercase, input_char, '')
-                # output_char = self.fake.random.choice(choice_str)
-                # A randomly choosen letter
-                output_char = self.fake.random.choice(string.ascii_lowercase)
-
-        else:  # Both letters and digits possible
-            # A randomly chosen neigbouring key in the same keyboard row
-            #
-            if rand_num <= self.single_typo_prob["same_row"]:
-                if input_char in rows:
-                    output_char = self.fake.random.choice(rows[input_char])
-                else:
-                    # TODO
-                    # Following line not understood in original implementation
-                    # choice_str = \
-                    #   string.replace(string.lowercase+string.digits, \
-                    #                     input_char, '')
-                    # output_char = self.fake.random.choice(choice_str)
-                    # A randomly choosen character
-                    output_char = self.fake.random.choice(
-                        string.ascii_lowercase + string.digits
-                    )
-            # A randomly chosen neigbouring key in the same keyboard column
-            elif rand_num <= (
-                self.single_typo_prob["same_row"] + self.single_typo_prob["same_col"]
-            ):
-                if input_char in cols:
-                    output_char = self.fake.random.choice(cols[input_char])
-                else:
-                    # TODO
-                    # Following line not understood in original implementation
-                    # choice_str = \
-                    # string.replace(string.lowercase+string.digits, \
-                    #                     input_char, '')
-                    # output_char = self.fake.random.choice(choice_str)
-                    # A randomly choosen character
-                    output_char = self.fake.random.choice(
-                        string.ascii_lowercase + string.digits
-                    )
-
-            else:
-                # TODO
-                # Following line not understood in original implementation
-                # choice_str =
-                # string.replace(string.lowercase+string.digits, \
-                #                       input_char, '')
-                # output_char = self.fake.random.choice(choice_str)
-                # A randomly choosen character
-                output_char = self.fake.random.choice(
-                    string.ascii_lowercase + string.digits
-                )
-
-        return output_char
+        same_row = self.single_typo_prob["same_row"]
+        same_col = same_row + self.single_typo_prob["same_col"]
+        key = input_char.lower()
+
+        if char_range == string.digits:
+            if input_char.isdigit() and rand_num <= same_row:
+                return self.fake.random.choice(KEYBOARD_ROWS[input_char])
+        elif rand_num <= same_row:
+            if key in KEYBOARD_ROWS:
+                return self.fake.random.choice(KEYBOARD_ROWS[key])
+        elif rand_num <= same_col:
+            if key in KEYBOARD_COLS:
+                return self.fake.random.choice(KEYBOARD_COLS[key])
+        return self.fake.random.choice(char_range)
+
+    def error_characters(self, rng, codes, kinds):
+        """
+        Vectorized error_character
+        codes are the code points of the characters to replace,
+        kinds index the character ranges 0 digits, 1 letters, 2 both
+        Returns the code points of the typos
+        """
+        n = len(codes)
+        rand_num = rng.random(n)
+        same_row = self.single_typo_prob["same_row"]
+        same_col = same_row + self.single_typo_prob["same_col"]
+
+        # Lookups on lowercase ASCII, other characters have no neighbours
+        is_upper = (codes >= ord("A")) & (codes <= ord("Z"))
+        keys = np.where(is_upper, codes + 32, codes)
+        keys = np.where(keys < 128, keys, 0).astype(np.int64)
+        row_counts = KEYBOARD_ROW_COUNTS[keys]
+        col_counts = KEYBOARD_COL_COUNTS[keys]
+        is_digit = (codes >= ord("0")) & (codes <= ord("9"))
+
+        use_row = (rand_num <= same_row) & (row_counts > 0)
+        use_row &= np.where(kinds == 0, is_digit, True)
+        use_col = (rand_num > same_row) & (rand_num <= same_col) & (col_counts > 0)
+        use_col &= kinds != 0
+
+        choice = rng.random(n)
+        typos = self.random_characters(rng, kinds)
+        row = (choice * row_counts).astype(np.int64)
+        col = (choice * col_counts).astype(np.int64)
+        typos = np.where(use_row, KEYBOARD_ROW_TABLE[keys, row], typos)
+        typos = np.where(use_col, KEYBOARD_COL_TABLE[keys, col], typos)
+        return typos.astype(np.uint32)
@@ -21,9 +21,13 @@
 
 """
 from importlib import import_module
+import copy
 import os
+import random
 import sys
 import pkgutil
+import threading
+import types
 
 
 def get_path(module):
@@ -62,13 +66,75 @@ PROVIDER_MODULES = find_available_providers(
 
 PROVIDERS = [import_module(module) for module in PROVIDER_MODULES]
 
+# Providers replacing formatters every provider inherits from
+# faker BaseProvider, e.g. random_int, are registered last
+OVERRIDE_PROVIDERS = ("dolos.simutable.providers.numeric",)
+
+
+# Configured faker generators by locale and provider modules
+_FAKER_CACHE = {}
+_FAKER_LOCK = threading.Lock()
+
+
+def clone_faker(template):
+    """
+    Copy of a configured faker generator
+    providers are copied and bound to the copy,
+    which gets its own unseeded random states
+    """
+    fake = copy.copy(template)
+    providers = {}
+    for provider in template.providers:
+        clone = copy.copy(provider)
+        clone.generator = fake
+        providers[id(provider)] = clone
+    fake.providers = [providers[id(provider)] for provider in template.providers]
+    for name, formatter in vars(template).items():
+        if isinstance(formatter, types.MethodType):
+            provider = providers.get(id(formatter.__self__))
+            if provider is not None:
+                setattr(fake, name, types.MethodType(formatter.__func__, provider))
+    fake.random = random.Random()
+    # numpy Generator cached by the providers
+    fake.rng = None
+    return fake
+
+
+def get_faker(locale, providers=None):
+    """
+    Faker generator for locale with the local providers added,
+    OVERRIDE_PROVIDERS after the others
+    Loading the locale and registering providers is done once
+    per process, every call returns an independent clone
+    """
+    from faker import Faker
+
+    if providers is None:
+        providers = PROVIDERS
+    providers = sorted(
+        providers, key=lambda provider: provider.__name__ in OVERRIDE_PROVIDERS
+    )
+    key = (locale, tuple(provider.__name__ for provider in providers))
+    with _FAKER_LOCK:
+        template = _FAKER_CACHE.get(key)
+        if template is None:
+            template = Faker(locale)
+            for provider in providers:
+                template.add_provider(provider.Provider)
+            _FAKER_CACHE[key] = template
+    return clone_faker(template)
+
 
 # Return a list of generator functions from simutable/provider
 def local_providers():
     provider_names = []
     for provider in PROVIDERS:
         provider_names.extend(
-            [x for x in dir(provider.Provider) if not x.startswith("_")]
+            [
+                x
+                for x in dir(provider.Provider)
+                if not x.startswith("_") and not x.endswith("_batch")
+            ]
         )
     return list(dict.fromkeys(provider_names))
 
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+#
+# Copyright © Her Majesty the Queen in Right of Canada, as represented
+# by the Minister of Statistics Canada, 2019.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Misspelling dictionaries for the record modifier
+
+A source table (csv, Arrow file or pyarrow Table) has one row
+per misspelling with columns word and misspelling.
+build() groups the misspellings per word into an uncompressed
+Arrow file of a single record batch and writes an open addressing
+hash index next to it, <path>.index.npy, slot i holds 1 + the row
+of the word or 0 if empty.
+Words are hashed with blake2b, which is stable across processes,
+and looked up in lowercase, misspellings are returned
+in the case of the word looked up.
+
+Both files are memory mapped, so worker processes share
+the pages of a dictionary instead of each holding a copy,
+pickling a table only sends its path.
+"""
+import bisect
+import hashlib
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+
+def word_hash(word):
+    digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def match_case(word, variant):
+    """
+    variant in the case of word, e.g. Smith, smyth -> Smyth
+    """
+    if word.isupper():
+        return variant.upper()
+    if word.istitle():
+        return " ".join(part[:1].upper() + part[1:] for part in variant.split(" "))
+    if word[:1].isupper():
+        return variant[:1].upper() + variant[1:]
+    return variant
+
+
+class MisspellingTable(object):
+    """
+    Memory mapped dictionary of word to list of misspellings
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Record batches reference the mapped pages, rows are located
+        # by batch offset, combining batches would copy them
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]
+        self._words = [batch.column("word") for batch in batches]
+        self._variants = [batch.column("misspellings") for batch in batches]
+        self._offsets = []
+        self._nrows = 0
+        for batch in batches:
+            self._offsets.append(self._nrows)
+            self._nrows += batch.num_rows
+        self._index = np.load(path + ".index.npy", mmap_mode="r")
+        self._mask = len(self._index) - 1
+
+    def __reduce__(self):
+        return (self.__class__, (self.path,))
+
+    def __len__(self):
+        return self._nrows
+
+    def _locate(self, row):
+        """
+        Record batch and row in the batch of a table row
+        """
+        chunk = bisect.bisect_right(self._offsets, row) - 1
+        return chunk, row - self._offsets[chunk]
+
+    def __contains__(self, word):
+        return self.find(word) is not None
+
+    @staticmethod
+    def read_source(source):
+        if isinstance(source, pa.Table):
+            return source
+        if source.endswith(".csv"):
+            return pa_csv.read_csv(source)
+        with pa.memory_map(source) as f:
+            return pa.ipc.open_file(f).read_all()
+
+    @classmethod
+    def build(cls, source, path):
+        """
+        Group the misspellings of source per word,
+        write the Arrow file and hash index at path
+        and return the memory mapped table
+        """
+        table = cls.read_source(source)
+        table = pa.table(
+            {
+                "word": pc.utf8_lower(table.column("word").cast(pa.string())),
+                "misspelling": table.column("misspelling").cast(pa.string()),
+            }
+        )
+        grouped = table.group_by("word").aggregate([("misspelling", "list")])
+        grouped = grouped.rename_columns(["word", "misspellings"]).combine_chunks()
+
+        words = grouped.column("word").to_pylist()
+        capacity = 1 << max(1, (2 * len(words) - 1).bit_length())
+        mask = capacity - 1
+        index = np.zeros(capacity, dtype=np.int64)
+        for row, word in enumerate(words):
+            slot = word_hash(word) & mask
+            while index[slot]:
+                slot = (slot + 1) & mask
+            index[slot] = row + 1
+
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, grouped.schema) as writer:
+                writer.write_table(grouped)
+        np.save(path + ".index.npy", index)
+        return cls(path)
+
+    def find(self, word):
+        """
+        Row of word in the table or None
+        """
+        word = word.lower()
+        slot = word_hash(word) & self._mask
+        while True:
+            row = int(self._index[slot]) - 1
+            if row < 0:
+                return None
+            chunk, pos = self._locate(row)
+            if self._words[chunk][pos].as_py() == word:
+                return row
+            slot = (slot + 1) & self._mask
+
+    def variants(self, word):
+        """
+        List of misspellings of word, empty if not in the table
+        """
+        row = self.find(word)
+        if row is None:
+            return []
+        chunk, pos = self._locate(row)
+        variants = self._variants[chunk][pos].as_py()
+        return [match_case(word, variant) for variant in variants]
+
+    def choice(self, word, random):
+        """
+        A random misspelling of word, None if not in the table
+        """
+        variants = self.variants(word)
+        if not variants:
+            return None
+        return random.choice(variants)
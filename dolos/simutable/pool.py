@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+#
+# Copyright © Her Majesty the Queen in Right of Canada, as represented
+# by the Minister of Statistics Canada, 2019.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pre-sampled value pools for expensive generators
+
+A pool generates size values of a field once and serves
+values by drawing random indices into the pool.
+This trades cardinality for throughput, a pooled field has at most
+size distinct values between refreshes, so repeated values
+are far more frequent than with the generator itself.
+For record linkage data this means that unrelated records
+share e.g. names more often than in a real population.
+
+Every refresh draws, evict * size randomly chosen slots
+are replaced with new values, evict=1.0 regenerates the pool.
+The refresh is checked once per sample call.
+
+A reseeded pool keeps its values, only the index draws
+follow the new random state, see ValuePool.reseed.
+"""
+import math
+
+import numpy as np
+
+
+class ValuePool(object):
+    """
+    Pool of values of a single generator
+    hits count values served from the pool,
+    misses count values generated to fill the pool
+    """
+
+    def __init__(self, column_fcn, rng, size, refresh=0, evict=1.0, block=1024):
+        """
+        column_fcn returns a list of n generated values
+        rng is a numpy random Generator
+        """
+        if size <= 0:
+            raise ValueError("Pool size must be positive")
+        self.column_fcn = column_fcn
+        self.size = size
+        self.refresh = refresh
+        self.evict = evict
+        self.block = block
+        self.hits = 0
+        self.misses = 0
+        self._filled = None
+        self.reset(rng)
+
+    def reset(self, rng):
+        """
+        Drop the pool, refilled from the new random state on next draw
+        """
+        self.rng = rng
+        self._values = None
+        self._filled = None
+        self._draws = 0
+        self._indices = []
+        self._pos = 0
+
+    def reseed(self, rng):
+        """
+        Draw indices from the new random state
+        the pool is restored to the values of its last fill,
+        so the draws do not depend on earlier refreshes
+        """
+        self.rng = rng
+        if self._filled is not None:
+            self._values = self._filled
+        self._draws = 0
+        self._indices = []
+        self._pos = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def generate(self, n):
+        values = np.empty(n, dtype=object)
+        values[:] = self.column_fcn(n)
+        self.misses += n
+        return values
+
+    def fill(self):
+        self._values = self._filled = self.generate(self.size)
+        self._draws = 0
+
+    def evict_values(self):
+        """
+        Replace a random subset of the pool with new values
+        the values of the last fill are kept for reseed
+        """
+        nevict = int(math.ceil(self.evict * self.size))
+        if nevict >= self.size:
+            self._values = self.generate(self.size)
+        else:
+            slots = self.rng.choice(self.size, nevict, replace=False)
+            if self._values is self._filled:
+                self._values = self._filled.copy()
+            self._values[slots] = self.generate(nevict)
+        self._draws = 0
+
+    def _check(self, n):
+        if self._values is None:
+            self.fill()
+        elif self.refresh and self._draws >= self.refresh:
+            self.evict_values()
+        self._draws += n
+        self.hits += n
+
+    def sample(self, n):
+        """
+        Draw n values with a vectorized index draw
+        """
+        self._check(n)
+        return self._values[self.rng.integers(0, self.size, n)]
+
+    def __call__(self):
+        """
+        Draw a single value, indices are drawn in blocks
+        """
+        self._check(1)
+        if self._pos == len(self._indices):
+            self._indices = self.rng.integers(0, self.size, self.block).tolist()
+            self._pos = 0
+        value = self._values[self._indices[self._pos]]
+        self._pos += 1
+        return value
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+#
+# Copyright © Her Majesty the Queen in Right of Canada, as represented
+# by the Minister of Statistics Canada, 2019.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local faker providers
+
+Providers draw arrays from the numpy Generator
+set as rng on the faker generator by the Synthesizer,
+which is seeded together with the faker random state.
+Single values are drawn from the faker random state.
+
+A list of field parameters is passed to a formatter as a single
+argument, fake(parms), formatters decorated with positional
+take the list as positional arguments, fake(*parms).
+"""
+import numpy as np
+
+
+def positional(fcn):
+    """
+    Mark a formatter to take a list of field parameters
+    as positional arguments
+    """
+    fcn.positional = True
+    return fcn
+
+
+def numpy_rng(generator):
+    """
+    numpy Generator of a faker generator,
+    outside of a Synthesizer seeded from the faker random state
+    on first use and cached on the faker generator
+    """
+    rng = getattr(generator, "rng", None)
+    if rng is None:
+        rng = np.random.default_rng(generator.random.getrandbits(64))
+        generator.rng = rng
+    return rng
@@ -8,18 +8,33 @@
 General linear model
 Simulate linear dependence between a predictor
 and set of independent random variables
+
+The link function is given by a parameter named link,
+with the name of the link as parameter type, e.g.
+name: "link", type: "logistic"
+identity  y = beta.X + gauss(0, sigma)
+logistic  y ~ Bernoulli(1 / (1 + exp(-beta.X)))
+poisson   y ~ Poisson(exp(beta.X))
+sigma only applies to the identity link
 """
 
+import math
+
 from faker.providers import BaseProvider
 import numpy as np
 
+from dolos.simutable.providers import numpy_rng
+
+
+LINKS = ("identity", "logistic", "poisson")
+
 
 class Provider(BaseProvider):
     """
     Simple General Linear Model with noise
     """
 
-    def sample(self, X, beta, sigma):
+    def sample(self, X, beta, sigma, link="identity"):
         """
         Sample from a normal distribution with
         width defined as sigma
@@ -50,31 +65,45 @@ class Provider(BaseProvider):
         if(throw < y): accept
         Should the scale go as 1/sqrt(sample size)?
         """
-        y = np.dot(np.asarray(X), beta) + self.generator.random.gauss(0.0, sigma)
-        return y
+        eta = np.dot(np.asarray(X), beta)
+        if link == "logistic":
+            # logistic function written with tanh, no overflow in exp
+            p = 0.5 * (1.0 + math.tanh(0.5 * eta))
+            return int(self.generator.random.random() < p)
+        if link == "poisson":
+            return int(numpy_rng(self.generator).poisson(math.exp(eta)))
+        return eta + self.generator.random.gauss(0.0, sigma)
 
-    def glm(self, params_or_msg):
+    def sample_batch(self, X, beta, sigma, link="identity"):
         """
-        expect a dictionary
+        Sample n predictions from an n x k design matrix
+        """
+        rng = numpy_rng(self.generator)
+        eta = X @ np.asarray(beta, dtype=np.float64)
+        if link == "logistic":
+            p = 0.5 * (1.0 + np.tanh(0.5 * eta))
+            return (rng.random(len(eta)) < p).astype(np.int64)
+        if link == "poisson":
+            return rng.poisson(np.exp(eta))
+        return eta + rng.normal(0.0, sigma, len(eta))
+
+    def parameters(self, params_or_msg):
+        """
+        Variable generators, beta, sigma and link
+        from a dictionary or the parameters message
         """
-        beta = None
-        sigma = None
-        ndof = None
-        X = None
         fields = []
-        fakers = []
         beta = []
+        sigma = None
+        link = "identity"
         if isinstance(params_or_msg, dict):
             generators = params_or_msg["Variables"]
-            # fields = []
             for item in generators:
                 fields.append(item["Generator"])
 
             beta = params_or_msg["Parameters"][:-1]
             sigma = params_or_msg["Parameters"][-1]
-            ndof = len(params_or_msg["Parameters"])
-            X = np.ones(ndof)
-            # fakers = []
+            link = params_or_msg.get("Link", link)
         else:
             for parameter in params_or_msg:
                 if parameter.HasField("variable"):
@@ -83,18 +112,44 @@ class Provider(BaseProvider):
                     beta.append(round(parameter.value, 4))
                 if parameter.name == "sigma":
                     sigma = round(parameter.value, 4)
-            ndof = len(beta) + 1
-            X = np.ones(ndof)
+                if parameter.name == "link":
+                    link = parameter.type
+        if link not in LINKS:
+            raise ValueError("Unknown link function %s" % link)
+        return fields, beta, sigma, link
+
+    def glm(self, params_or_msg, inputs=None):
+        """
+        expect a dictionary
+        With inputs, the values of the variables, returns the prediction,
+        otherwise the variables are generated
+        and returns the variables and prediction
+        """
+        fields, beta, sigma, link = self.parameters(params_or_msg)
+        X = np.ones(len(beta) + 1)
 
+        if inputs is not None:
+            X[: len(inputs)] = inputs
+            return self.sample(X[:-1], beta, sigma, link)
+
+        fakers = []
         for counter, f in enumerate(fields):
-            fake = None
-            try:
-                fake = self.generator.get_formatter(f)
-            except Exception:
-                raise
+            fake = self.generator.get_formatter(f)
             X[counter] = fake()
             fakers.append(X[counter])
 
-        fakers.append(self.sample(X[:-1], beta, sigma))
+        fakers.append(self.sample(X[:-1], beta, sigma, link))
 
         return fakers
+
+    def glm_batch(self, params_or_msg, columns):
+        """
+        Predictions for a batch given the columns of the variables
+        Variables not given, e.g. the intercept, are set to 1
+        """
+        _, beta, sigma, link = self.parameters(params_or_msg)
+        nrows = len(columns[0]) if columns else 0
+        X = np.ones((nrows, len(beta)))
+        for counter, column in enumerate(columns):
+            X[:, counter] = column
+        return self.sample_batch(X, beta, sigma, link)
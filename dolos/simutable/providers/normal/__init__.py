@@ -13,14 +13,18 @@ import unittest
 from faker import Faker
 from faker.providers import BaseProvider
 
+from dolos.simutable.providers import numpy_rng, positional
 
-class Provider(BaseProvider):
-    def normal(self):
-        mu = 0
-        sigma = 1
 
+class Provider(BaseProvider):
+    @positional
+    def normal(self, mu=0.0, sigma=1.0):
         return self.generator.random.normalvariate(mu, sigma)
 
+    @positional
+    def normal_batch(self, mu=0.0, sigma=1.0, size=1):
+        return numpy_rng(self.generator).normal(mu, sigma, size)
+
 
 class TestCase(unittest.TestCase):
     def test(self):
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+#
+# Copyright © Her Majesty the Queen in Right of Canada, as represented
+# by the Minister of Statistics Canada, 2019.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+faker numeric formatters with column variants
+replaces random_int and ean of faker with the same arguments,
+the _batch variants return a whole column drawn from a numpy Generator
+"""
+
+from faker.providers import BaseProvider
+import numpy as np
+
+from dolos.simutable.providers import numpy_rng, positional
+
+
+class Provider(BaseProvider):
+    @positional
+    def random_int(self, min=0, max=9999, step=1):
+        """
+        Random integer between min and max inclusive
+        """
+        return self.generator.random.randrange(min, max + 1, step)
+
+    @positional
+    def random_int_batch(self, min=0, max=9999, step=1, size=1):
+        nsteps = (max - min) // step + 1
+        return min + step * numpy_rng(self.generator).integers(0, nsteps, size)
+
+    def ean(self, length=13):
+        """
+        EAN-8 or EAN-13 barcode with check digit
+        """
+        if length not in (8, 13):
+            raise AssertionError("length can only be 8 or 13")
+        code = [self.generator.random.randrange(10) for _ in range(length - 1)]
+        # weights 3, 1, ... ending with 3 next to the check digit
+        weighted_sum = sum(
+            digit * (3 if (length - pos) % 2 == 0 else 1)
+            for pos, digit in enumerate(code)
+        )
+        code.append((10 - weighted_sum % 10) % 10)
+        return "".join(str(digit) for digit in code)
+
+    def ean_batch(self, length=13, size=1):
+        if length not in (8, 13):
+            raise AssertionError("length can only be 8 or 13")
+        digits = numpy_rng(self.generator).integers(
+            0, 10, (size, length), dtype=np.uint8
+        )
+        # weights 3, 1, ... ending with 3 next to the check digit
+        weights = np.where(np.arange(length - 1)[::-1] % 2 == 0, 3, 1)
+        weighted_sum = digits[:, :-1].astype(np.int64) @ weights
+        digits[:, -1] = (10 - weighted_sum % 10) % 10
+        codes = (digits + ord("0")).view("S%d" % length).ravel()
+        return codes.astype("U%d" % length).tolist()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+#
+# Copyright © Her Majesty the Queen in Right of Canada, as represented
+# by the Minister of Statistics Canada, 2019.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Weighted sampling with the alias method
+
+Vose's alias method builds two tables once from the weights,
+each draw then takes a single uniform random number and O(1) time
+regardless of the number of outcomes.
+https://www.keithschwarz.com/darts-dice-coins/
+"""
+import numpy as np
+
+
+class AliasSampler(object):
+    """
+    Draw values with probabilities proportional to weights
+    """
+
+    def __init__(self, values, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(values) != len(weights) or len(values) == 0:
+            raise ValueError("Require one weight per value")
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Weights must be positive")
+
+        self.values = list(values)
+        self.probabilities = weights / weights.sum()
+
+        n = len(weights)
+        scaled = self.probabilities * n
+        prob = np.ones(n)
+        alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Remaining entries are 1 up to rounding
+
+        self._n = n
+        self._prob = prob
+        self._alias = alias
+        self._prob_list = prob.tolist()
+        self._alias_list = alias.tolist()
+        self._values = np.asarray(self.values)
+
+    def mean(self):
+        return float(np.dot(self._values, self.probabilities))
+
+    def draw(self, random):
+        """
+        Single draw using random.random() of a python Random instance
+        """
+        u = random.random() * self._n
+        i = min(int(u), self._n - 1)
+        if u - i < self._prob_list[i]:
+            return self.values[i]
+        return self.values[self._alias_list[i]]
+
+    def draw_batch(self, rng, size):
+        """
+        Array of size draws from a numpy random Generator
+        """
+        return self._values[self.draw_index_batch(rng, size)]
+
+    def draw_index_batch(self, rng, size):
+        """
+        Indices into values of size draws
+        """
+        u = rng.random(size) * self._n
+        i = np.minimum(u.astype(np.int64), self._n - 1)
+        return np.where(u - i < self._prob[i], i, self._alias[i])
@@ -19,18 +19,39 @@
 """
 Generates the data using faker
 """
-import logging
+import math
+import time
 
+from functools import partial
 from pprint import pformat
-from faker import Faker
+import numpy as np
 
 #
 # from artemis_externals.physt.histogram1d import Histogram1D
 
 from artemis_base.utils.logger import Logger
 
-from dolos.simutable.loader import PROVIDERS
+from dolos.simutable.loader import get_faker
 from dolos.simutable.febrlgen import Modifier
+from dolos.simutable.pool import ValuePool
+from dolos.simutable.sampler import AliasSampler
+
+# Row path records timed per field, one in TIME_SAMPLE
+TIME_SAMPLE = 64
+# Spawn key of the random stream filling the value pools
+POOL_STREAM = 1
+
+
+def as_column(values, size):
+    """
+    Column of a batch as a numpy array of size values
+    numeric columns keep their dtype, other values are held in object arrays
+    """
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in "biuf":
+            return values
+        return values.astype(object)
+    return np.fromiter(values, dtype=object, count=size)
 
 
 @Logger.logged
@@ -46,22 +67,44 @@ class Synthesizer(object):
 
     e.g. generate data and insert null for imputation
 
-    # Bug
-    # The modifier is not picking up the seed since it is instantiated
-    # before seed is set. Needs to be investigated!
+    The seed is set on this instance's faker only, the modifier
+    shares the same faker and therefore the same random stream
     """
 
-    def __init__(self, model, local, idx=0, seed=None):
+    def __init__(
+        self,
+        model,
+        local,
+        idx=0,
+        seed=None,
+        pool_size=0,
+        pool_refresh=0,
+        pool_evict=1.0,
+        pool_fields=None,
+        misspellings=None,
+        field_swaps=None,
+        reservoir_size=0,
+    ):
         """
         requires class model name
+        misspellings maps field names to misspelling dictionaries,
+        see dolos.simutable.misspelling
+        field_swaps maps pairs of field names to the probability
+        of exchanging their values in a duplicate
+        reservoir_size > 0 keeps up to reservoir_size originals
+        with pending duplicates, which generate emits
+        at random later positions instead of right after the original,
+        the reservoir is carried over until drained, see generate_columns
+
+        pool_size > 0 serves fields from pre-sampled value pools,
+        by default all String fields, or the fields in pool_fields,
+        see dolos.simutable.pool for the cardinality trade-off
         """
 
         self.__logger.info("Synthesizer init")
-        self.__logger.debug("DEBUG Message")
 
-        self.fake = Faker(local)
+        self.fake = get_faker(local)
         self.__reccntr = idx
-        self.add_providers()
         self.schema = []
         self.is_dependent = []
         for field in model.info.schema.info.fields:
@@ -71,23 +114,49 @@ class Synthesizer(object):
             else:
                 self.is_dependent.append(True)
 
+        # Vectorized draws, seeded together with faker
+        # and shared with the providers as fake.rng
+        self.rng = np.random.default_rng()
+        self.fake.rng = self.rng
+        self.pools = {}
+        self.pool_size = pool_size
+        self.pool_refresh = pool_refresh
+        self.pool_evict = pool_evict
+        self.pool_fields = pool_fields
+
         if seed:
             self.set_seed(seed)
 
         # Cache the generator functions once
         self.generator_fcns = {}
+        # Row plan of (name, position, callable, input positions) per field
+        self._plan = []
+        # Column plan of (field name, callable(n), input fields) per field
+        self._column_fcns = {}
+        self._columns = []
+        # Generation time in ns per field
+        self.field_time = {}
 
         self.set_generators_from_proto(model)
+        if seed and self.pools:
+            self.fill_pools(seed)
 
         # Following extension for generating duplicate records
         self.__dupcntr = 0
         self.__maxdup = 0
-        self.__dupdist = []  # List of duplicate counts
+        self.__dupdist = []  # Number of originals per duplicate count
+        # Originals with pending duplicates, [record, ndups, emitted]
+        self.reservoir_size = reservoir_size
+        self._reservoir = []
+        self._pending = 0  # Number of pending duplicates
+        self._rows_left = None  # Rows left to drain the reservoir
+        self._emit_prob = 0.0
 
         self._original = []
         self.duplicate = False
         self._expect_duplicate = False
         self.nduplicate_weights = None
+        self.nduplicate_sampler = None
         self.wrg = None
         self.mod = None
 
@@ -103,13 +172,23 @@ class Synthesizer(object):
             self.duplicate_cfg["Max_duplicate"] = model.info.aux.duplicate.maximum
 
             self.nduplicate_weights = self.generate_duplicate_pdf()
-            if model.info.aux.HasField("record_modifier"):
+            self.__dupdist = [0] * (self.duplicate_cfg["Max_duplicate"] + 1)
+            self.nduplicate_sampler = AliasSampler(*zip(*self.nduplicate_weights))
+            # Fraction of duplicates in the output
+            prob = self.duplicate_cfg["Prob_duplicate"]
+            ndups = prob * self.nduplicate_sampler.mean()
+            self._emit_prob = ndups / (1.0 + ndups)
+            if model.info.aux.HasField("record_modifier") or field_swaps:
                 self.mod = Modifier(
                     self.fake,
                     self.generator_fcns,
                     self.schema,
                     model.info.aux.record_modifier,
+                    misspellings,
+                    field_swaps,
                 )
+        elif field_swaps:
+            raise ValueError("Field swaps require duplicate records")
 
         self.__logger.info("")
         self.__logger.info("Synthesizer configured")
@@ -148,6 +227,14 @@ class Synthesizer(object):
     def schema(self, value):
         self.__schema = list(value)
 
+    @property
+    def columnar(self):
+        """
+        Whether generate_batch produces the configured records,
+        scattered duplicates (reservoir_size) are placed record by record
+        """
+        return not (self.duplicate and self.reservoir_size > 0)
+
     def record_counter(self):
         self.__reccntr += 1
         self.stats["Original"] += 1
@@ -157,15 +244,43 @@ class Synthesizer(object):
         return id
 
     def set_seed(self, seed):
-        self.fake.seed(seed)
+        """
+        Seed the random generator of this instance only,
+        Faker.seed reseeds the module level generator shared by all instances
+        """
+        self.fake.seed_instance(seed)
+        self.rng = np.random.default_rng(seed)
+        self.fake.rng = self.rng
+        for pool in self.pools.values():
+            pool.reseed(self.rng)
 
-    def add_providers(self):
+    def fill_pools(self, seed):
         """
-        Add custom providers
+        Fill the value pools once from a stream derived from seed,
+        then seed this instance with seed
+        Reseeding keeps the pooled values, so records seeded
+        per batch draw from the same pools in any process
         """
-        klasses = [provider.Provider for provider in PROVIDERS]
-        for k in klasses:
-            self.fake.add_provider(k)
+        seq = np.random.SeedSequence(seed, spawn_key=(POOL_STREAM,))
+        self.set_seed(int(seq.generate_state(1)[0]))
+        for pool in self.pools.values():
+            pool.fill()
+        self.set_seed(seed)
+
+    def reset(self, idx=0, seed=None):
+        """
+        Start an independent stream of records
+        record counter starts at idx, pending duplicates are dropped
+        """
+        if seed is not None:
+            self.set_seed(seed)
+        self.record_count = idx
+        self.reset_original()
+        self._reservoir = []
+        self._pending = 0
+        self._expect_duplicate = False
+        self.__dupcntr = 0
+        self.__maxdup = 0
 
     def get_field_parameters(self, in_parms):
         """
@@ -175,30 +290,86 @@ class Synthesizer(object):
         """
         if len(in_parms) == 0:
             return None
+        # Generators with Field parameters parse the message,
+        # the type of other parameters may be e.g. a link function
+        if any(parm.type == "Field" for parm in in_parms):
+            return in_parms
 
         values = []
-        is_msg = False
         for parm in in_parms:
-            if parm.type == "Field":
-                is_msg = True
-                continue
             _type = eval(parm.type)
             value = _type(parm.value)
             values.append(value)
-        if is_msg is True:
-            return in_parms
-        elif len(values) == 1:
+        if len(values) == 1:
             return values[-1]
         else:
             return values
 
+    def resolve_dependencies(self, table):
+        """
+        Order the fields of the table so that every field
+        follows the fields it depends on
+        Field parameters of a generator, e.g. the variables of a glm,
+        are the inputs of the field
+        Returns a list of (field, input field names)
+        """
+        fields = {}
+        inputs = {}
+        for field in table.info.schema.info.fields:
+            fields[field.name] = field
+            names = []
+            for parm in field.info.aux.generator.parameters:
+                if parm.type != "Field":
+                    continue
+                if parm.HasField("variable"):
+                    names.append(parm.variable.name)
+                else:
+                    names.append(parm.name)
+            inputs[field.name] = names
+
+        for name, names in inputs.items():
+            for upstream in names:
+                if upstream not in fields:
+                    raise ValueError(
+                        "Field %s depends on unknown field %s" % (name, upstream)
+                    )
+
+        # Kahn's algorithm, ties are kept in schema order
+        order = []
+        done = set()
+        remaining = list(fields)
+        while remaining:
+            ready = [
+                name
+                for name in remaining
+                if all(upstream in done for upstream in inputs[name])
+            ]
+            if not ready:
+                raise ValueError("Cyclic field dependencies: %s" % remaining)
+            for name in ready:
+                order.append((fields[name], inputs[name]))
+                done.add(name)
+            remaining = [name for name in remaining if name not in done]
+        return order
+
     def set_generators_from_proto(self, table):
+        """
+        Cache the generator function and parameters of each field
+        and compile the plans executed by generate_original
+        and generate_originals, fields are evaluated once
+        in dependency order, parameters are bound to the callable.
+        Fields with Field parameters, e.g. glm, are called
+        with the values of their inputs fake(parms, inputs)
+        Column functions use the provider batch hook <name>_batch if defined
+        """
         self.__logger.info("Setting Generator functions from Msg")
-        for field in table.info.schema.info.fields:
+        self._plan = []
+        self._column_fcns = {}
+        self._columns = []
+        self.field_time = {}
+        position = {name: pos for pos, name in enumerate(self.schema)}
+        for field, inputs in self.resolve_dependencies(table):
             self.__logger.info("Gathering fakers %s", field.name)
-            if field.info.aux.dependent != "":
-                continue
-            self.__logger.info("Independent field %s", field)
             parms = self.get_field_parameters(field.info.aux.generator.parameters)
             fake = None
             if field.name == "record_id":
@@ -212,28 +383,131 @@ class Synthesizer(object):
                     )
 
             self.generator_fcns[field.name] = (fake, parms)
+            column_fcn = self.get_column_function(field, fake, parms, inputs)
+
+            if self.is_pooled(field, inputs):
+                pool = ValuePool(
+                    column_fcn,
+                    self.rng,
+                    self.pool_size,
+                    self.pool_refresh,
+                    self.pool_evict,
+                )
+                self.pools[field.name] = pool
+                row_fcn = pool
+                column_fcn = pool.sample
+            else:
+                row_fcn = self.bind(fake, parms)
+            self._plan.append(
+                (
+                    field.name,
+                    position[field.name],
+                    row_fcn,
+                    [position[name] for name in inputs],
+                )
+            )
+            self._column_fcns[field.name] = column_fcn
+            self._columns.append((field.name, column_fcn, inputs))
+            self.field_time[field.name] = 0
             self.__logger.debug(parms)
             self.__logger.debug(fake)
             self.__logger.debug(self.generator_fcns[field.name])
 
+    def is_pooled(self, field, inputs):
+        if self.pool_size <= 0 or inputs or field.name == "record_id":
+            return False
+        if self.pool_fields is None:
+            return field.info.type == "String"
+        return field.name in self.pool_fields
+
+    def pool_stats(self):
+        """
+        Hits, misses and hit rate per pooled field
+        """
+        return {
+            name: {"hits": pool.hits, "misses": pool.misses, "hit_rate": pool.hit_rate}
+            for name, pool in self.pools.items()
+        }
+
+    @staticmethod
+    def bind(fcn, parms):
+        """
+        Bind the field parameters to a generator,
+        a list of values is passed as one argument unless the generator
+        is marked positional, see dolos.simutable.providers
+        """
+        if parms is None:
+            return fcn
+        if isinstance(parms, list) and getattr(fcn, "positional", False):
+            return partial(fcn, *parms)
+        return partial(fcn, parms)
+
+    def get_column_function(self, field, fake, parms, inputs=()):
+        """
+        Returns a callable generating n values of a field
+        Providers may vectorize a generator with a hook
+        <name>_batch(parms, size=n), taking the same parameters
+        as the generator, otherwise the generator is called once per value
+        Fields with inputs take the input columns as well,
+        callable(n, columns), the hook is <name>_batch(parms, columns)
+        """
+        if field.name == "record_id":
+            return self.record_id_batch
+        try:
+            hook = self.fake.get_formatter(field.info.aux.generator.name + "_batch")
+        except AttributeError:
+            hook = None
+
+        if inputs:
+            if hook is not None:
+                return lambda size, columns: hook(parms, columns)
+            return lambda size, columns: [
+                fake(parms, list(values)) for values in zip(*columns)
+            ]
+        if hook is not None:
+            hook = self.bind(hook, parms)
+            return lambda size: hook(size=size)
+        fake = self.bind(fake, parms)
+        return lambda size: [fake() for _ in range(size)]
+
+    def record_id_batch(self, size):
+        start = self.record_count
+        return ["rec-" + str(idx) + "-id" for idx in range(start, start + size)]
+
     def generate_duplicate_pdf(self):
         """
         Create a map of duplicates and probabilities
-        according to a pdf, i.e. uniform
+        according to a pdf, truncated to 1 up to Max_duplicate
         and store for re-use on each original event
-        current version taken directly from FEBRL
-        needs review b/c number of duplicates stored starts at 2?
+        Distributions as defined in FEBRL:
+        uniform
+        poisson, with mean (Max_duplicate + 1) / 2
+        zipf, probability proportional to 1 / n ** (1 - theta), theta = 0.5
         """
-        num_dup = 1
-        prob_sum = 0.0
-        prob_list = [(num_dup, prob_sum)]
         max_dups = self.duplicate_cfg["Max_duplicate"]
-        uniform_val = 1.0 / float(max_dups)
+        dist = self.duplicate_cfg["Dist_duplicate"].lower()
+        if max_dups < 1:
+            raise ValueError("Maximum number of duplicates must be positive")
+
+        num_dups = range(1, max_dups + 1)
+        if dist in ("", "uniform"):
+            weights = [1.0 for _ in num_dups]
+        elif dist == "poisson":
+            lam = (max_dups - 1) / 2.0
+            weights = [
+                math.exp((n - 1) * math.log(lam) - lam - math.lgamma(n))
+                if lam > 0
+                else float(n == 1)
+                for n in num_dups
+            ]
+        elif dist == "zipf":
+            theta = 0.5
+            weights = [1.0 / n ** (1.0 - theta) for n in num_dups]
+        else:
+            raise ValueError("Unknown duplicate distribution %s" % dist)
 
-        for i in range(max_dups - 1):
-            num_dup += 1
-            prob_list.append((num_dup, uniform_val + prob_list[-1][1]))
-        return prob_list
+        norm = sum(weights)
+        return [(n, weight / norm) for n, weight in zip(num_dups, weights)]
 
     def cache_original(self, darr):
         self._original = darr
@@ -242,27 +516,35 @@ class Synthesizer(object):
         self._original = []
 
     def generate_original(self):
-        fakers = self.schema
         self.reset_original()
-        self.__logger.debug("generate_original()")
-        self.__logger.debug("Event ID %d" % self.record_count)
-        darr = []
-        for i, fake in enumerate(fakers):
-            if self.is_dependent[i] is True:
-                continue
-            if self.generator_fcns[fake][1] is None:
-                value = self.generator_fcns[fake][0]()
-                darr.append(value)
-            else:
-                value = self.generator_fcns[fake][0](self.generator_fcns[fake][1])
-                if isinstance(value, list):
-                    darr.extend(value)
+        darr = [None] * len(self.schema)
+        if self.stats["Original"] % TIME_SAMPLE == 0:
+            self.generate_timed(darr)
+        else:
+            for name, pos, fake, inputs in self._plan:
+                if inputs:
+                    darr[pos] = fake([darr[i] for i in inputs])
                 else:
-                    darr.append(value)
+                    darr[pos] = fake()
         self.record_counter()
         self.cache_original(darr)
         return darr
 
+    def generate_timed(self, darr):
+        """
+        Generate a record with each field timed,
+        the time stands for the TIME_SAMPLE records until the next timed one
+        """
+        field_time = self.field_time
+        clock = time.perf_counter_ns
+        for name, pos, fake, inputs in self._plan:
+            start = clock()
+            if inputs:
+                darr[pos] = fake([darr[i] for i in inputs])
+            else:
+                darr[pos] = fake()
+            field_time[name] += (clock() - start) * TIME_SAMPLE
+
     def duplicate_original(self):
         darr = []
         if self._original is None:
@@ -281,10 +563,7 @@ class Synthesizer(object):
         return darr
 
     def random_select_ndups(self):
-        ind = -1
-        while self.nduplicate_weights[ind][1] > self.fake.random.random():
-            ind -= 1
-        return self.nduplicate_weights[ind][0]
+        return self.nduplicate_sampler.draw(self.fake.random)
 
     def expect_duplicate(self):
         """
@@ -302,62 +581,279 @@ class Synthesizer(object):
         else:
             self._expect_duplicate = False
             self.__maxdup = 0
-
-        self.__logger.debug("expect_duplicate ndups: %d", self.__maxdup)
+        self.__dupdist[self.__maxdup] += 1
 
     def generate(self):
         darr = []
-        if self.duplicate is True:
+        if self.duplicate is True and self.reservoir_size > 0:
+            darr = self.generate_scattered()
+        elif self.duplicate is True:
             # Apply duplicate data generation
             # Ensure original record is already cached
             if self._expect_duplicate is False:
                 darr = self.generate_original()
                 self.expect_duplicate()
-                if logging.getLogger().isEnabledFor(logging.DEBUG):
-                    self.__logger.debug("Original record")
-                    self.__logger.debug(pformat(self._original))
 
             elif self._expect_duplicate is True:
                 if self.__dupcntr < self.__maxdup:
                     darr = self.duplicate_original()
                 else:
-                    # Update duplicate distribution
-                    self.__logger.debug(
-                        "Event %d duplicates %d", (self.stats["Total"], self.__dupcntr)
-                    )
-                    #
-                    # self.h_dupdist.fill(self.__dupcntr)
                     # clear cache
                     self.reset_original()
                     darr = self.generate_original()
                     # Get the probability to generate duplicate for next record
                     self.expect_duplicate()
             else:
-                self.__logger.debug(
-                    "Not generating duplicate for Event ID %d", self.record_count
-                )
                 darr = self.generate_original()
         else:
             darr = self.generate_original()
 
         self.stats["Total"] += 1
-        if self.stats["Total"] % 10000 == 0:
-            self.__logger.info("Event counter: %d" % self.stats["Total"])
-        self.__logger.debug("Complete Event ID %d" % self.record_count)
         return darr
 
+    def generate_scattered(self):
+        """
+        Emit a pending duplicate from the reservoir or a new original
+        A duplicate is emitted with the expected fraction of duplicates
+        in the output, or whenever the reservoir is full,
+        so memory is bounded by reservoir_size originals.
+        When draining, duplicates are emitted once they fill the rows left
+        and the duplicates of new originals are truncated to fit
+        """
+        reservoir = self._reservoir
+        left = self._rows_left
+        if reservoir and (
+            len(reservoir) >= self.reservoir_size
+            or (left is not None and self._pending >= left)
+            or self.fake.random.random() < self._emit_prob
+        ):
+            return self.emit_duplicate()
+
+        darr = self.generate_original()
+        self.expect_duplicate()
+        if self._expect_duplicate:
+            ndups = self.__maxdup
+            if left is not None and ndups > left - 1 - self._pending:
+                ndups = max(left - 1 - self._pending, 0)
+                self.__dupdist[self.__maxdup] -= 1
+                self.__dupdist[ndups] += 1
+            if ndups > 0:
+                reservoir.append([darr.copy(), ndups, 0])
+                self._pending += ndups
+            self._expect_duplicate = False
+        return darr
+
+    def emit_duplicate(self):
+        """
+        Duplicate of a random original in the reservoir
+        """
+        reservoir = self._reservoir
+        pos = self.fake.random.randrange(len(reservoir))
+        entry = reservoir[pos]
+        darr = entry[0].copy()
+        if "rec" in darr[0]:
+            darr[0] = darr[0] + "-dup-" + str(entry[2])
+        if self.mod:
+            self.mod.modify(darr)
+        entry[2] += 1
+        if entry[2] == entry[1]:
+            reservoir[pos] = reservoir[-1]
+            reservoir.pop()
+        self._pending -= 1
+        self.stats["Duplicate"] += 1
+        return darr
+
+    def generate_column(self, field, nrows):
+        """
+        Generate nrows values of a single independent field
+        """
+        for name, _, inputs in self._columns:
+            if name == field and inputs:
+                raise ValueError(
+                    "Field %s depends on %s, use generate_batch" % (field, inputs)
+                )
+        start = time.perf_counter_ns()
+        values = self._column_fcns[field](nrows)
+        self.field_time[field] += time.perf_counter_ns() - start
+        return values
+
+    def generate_batch(self, nrows):
+        """
+        Generate nrows records column by column
+        Returns a dictionary of field name to column, a numpy array,
+        see as_column
+        One call per field instead of one per value,
+        values differ from the row path for a given seed
+        With duplicates the batch layout is planned up front,
+        originals are generated once and copied to their duplicate slots,
+        the reservoir only applies to generate
+        """
+        if self.duplicate is False:
+            return self.generate_originals(nrows)
+        ndups = self.plan_duplicates(nrows)
+        columns = self.generate_originals(len(ndups))
+        return self.duplicate_batch(columns, ndups)
+
+    def generate_originals(self, nrows):
+        """
+        Generate nrows original records column by column
+        """
+        columns = {}
+        for name, column_fcn, inputs in self._columns:
+            start = time.perf_counter_ns()
+            if inputs:
+                values = column_fcn(nrows, [columns[i] for i in inputs])
+            else:
+                values = column_fcn(nrows)
+            columns[name] = as_column(values, nrows)
+            self.field_time[name] += time.perf_counter_ns() - start
+        columns = {name: columns[name] for name in self.schema}
+        self.record_count += nrows
+        self.stats["Original"] += nrows
+        self.stats["Total"] += nrows
+        return columns
+
+    def draw_nduplicates(self, size):
+        """
+        Draw size duplicate counts from the duplicate pdf
+        """
+        return self.nduplicate_sampler.draw_batch(self.rng, size)
+
+    def plan_duplicates(self, nrows):
+        """
+        Number of duplicates of each original in a batch of nrows records
+        Originals are duplicated with probability Prob_duplicate,
+        counts are drawn for a whole block of originals at once.
+        The last original's duplicates are truncated to fill exactly nrows
+        """
+        if nrows <= 0:
+            return np.zeros(0, dtype=np.int64)
+        prob = self.duplicate_cfg["Prob_duplicate"]
+        mean = 1.0 + prob * self.nduplicate_sampler.mean()
+        ndups = np.zeros(0, dtype=np.int64)
+        total = 0
+        while total < nrows:
+            size = int((nrows - total) / mean) + 1
+            is_dup = self.rng.random(size) < prob
+            block = np.where(is_dup, self.draw_nduplicates(size), 0)
+            ndups = np.concatenate([ndups, block])
+            total = len(ndups) + int(ndups.sum())
+
+        ends = np.cumsum(ndups + 1)
+        noriginals = int(np.searchsorted(ends, nrows)) + 1
+        ndups = ndups[:noriginals]
+        ndups[-1] -= ends[noriginals - 1] - nrows
+        counts = np.bincount(ndups, minlength=len(self.__dupdist))
+        for n, count in enumerate(counts.tolist()):
+            self.__dupdist[n] += count
+        return ndups
+
+    def duplicate_batch(self, columns, ndups):
+        """
+        Copy originals into their duplicate slots in bulk
+        duplicates follow their original, record ids are suffixed
+        with -dup-n and the record modifier is applied to duplicates
+        """
+        counts = ndups + 1
+        index = np.repeat(np.arange(len(ndups)), counts)
+        starts = np.cumsum(counts) - counts
+        rank = np.arange(len(index)) - np.repeat(starts, counts)
+        duplicates = np.flatnonzero(rank)
+
+        batch = {name: column[index] for name, column in columns.items()}
+
+        if "record_id" in batch:
+            suffix = (rank[duplicates] - 1).astype(str).astype(object)
+            ids = batch["record_id"]
+            ids[duplicates] = ids[duplicates] + "-dup-" + suffix
+
+        if self.mod and len(duplicates):
+            self.mod.modify_columns(batch, duplicates)
+
+        self.stats["Duplicate"] += len(duplicates)
+        self.stats["Total"] += len(duplicates)
+        return batch
+
+    def generate_columns(self, nrows, drain=False):
+        """
+        Generate nrows records directly into per-field column buffers
+        Records are drawn in the same order as repeated calls to generate,
+        so for a given seed the values are identical to the row path
+        drain empties the duplicate reservoir within the nrows records,
+        otherwise pending duplicates are carried over to the next call
+        """
+        columns = [[] for _ in self.schema]
+        appends = [column.append for column in columns]
+        ncols = len(columns)
+        for left in range(nrows, 0, -1):
+            if drain:
+                self._rows_left = left
+            darr = self.generate()
+            if len(darr) != ncols:
+                raise ValueError(
+                    "Record has %d values, schema has %d" % (len(darr), ncols)
+                )
+            for append, value in zip(appends, darr):
+                append(value)
+        self._rows_left = None
+        return columns
+
+    def snapshot(self):
+        """
+        Counters of the records generated so far
+        field_time is the generation time in ns per field,
+        timed once per batch by column, sampled one record
+        in TIME_SAMPLE by row
+        """
+        metrics = {
+            "rows": self.stats["Total"],
+            "originals": self.stats["Original"],
+            "duplicates": self.stats["Duplicate"],
+            "duplicate_distribution": dict(enumerate(self.__dupdist)),
+            "pending_originals": len(self._reservoir),
+            "field_time": dict(self.field_time),
+            "pools": self.pool_stats(),
+        }
+        if self.mod:
+            metrics["modifier"] = self.mod.snapshot()
+        return metrics
+
+    @staticmethod
+    def merge_snapshots(snapshots):
+        """
+        Sum the snapshots of several synthesizers, e.g. one per process
+        """
+        merged = {}
+        for snapshot in snapshots:
+            for key, value in snapshot.items():
+                if isinstance(value, dict):
+                    merged[key] = Synthesizer.merge_snapshots(
+                        [merged.get(key, {}), value]
+                    )
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        if "hits" in merged and "misses" in merged:
+            total = merged["hits"] + merged["misses"]
+            merged["hit_rate"] = merged["hits"] / total if total else 0.0
+        return merged
+
     def plots(self):
+        metrics = self.snapshot()
         self.__logger.info("=============================================")
         self.__logger.info("Synthesizer job summary")
         self.__logger.info("=============================================")
         self.__logger.info("Duplicate distribution")
-        self.__logger.info(pformat(self.__dupdist))
+        self.__logger.info(pformat(metrics["duplicate_distribution"]))
         self.__logger.info("Event counters")
-        self.__logger.info("Total records: %d" % self.stats["Total"])
-        self.__logger.info("Original records: %d" % self.stats["Original"])
-        self.__logger.info("Duplicate records: %d" % self.stats["Duplicate"])
-        # self.__logger.info(pformat(self.h_dupdist.to_dict()))
-        if self.duplicate is True:
+        self.__logger.info("Total records: %d", metrics["rows"])
+        self.__logger.info("Original records: %d", metrics["originals"])
+        self.__logger.info("Duplicate records: %d", metrics["duplicates"])
+        self.__logger.info("Field generation time (ns)")
+        self.__logger.info(pformat(metrics["field_time"]))
+        if self.pools:
+            self.__logger.info("Value pools")
+            self.__logger.info(pformat(metrics["pools"]))
+        if self.mod:
             self.mod.get_stats()
         self.__logger.info("=============================================")
         self.__logger.info("=============================================")
@@ -0,0 +1,123 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+#
+# Copyright © Her Majesty the Queen in Right of Canada, as represented
+# by the Minister of Statistics Canada, 2019.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test misspelling dictionaries
+"""
+
+import unittest
+import os
+import pickle
+import random
+import shutil
+import tempfile
+
+import pyarrow as pa
+
+from artemis_format.pymodels.table_pb2 import Table
+from dolos.simutable.misspelling import MisspellingTable
+from dolos.simutable.synthesizer import Synthesizer
+
+
+class MisspellingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmpdir.name, "names.csv")
+        with open(self.csv, "w") as f:
+            f.write("word,misspelling\n")
+            f.write("Tremblay,tremblai\n")
+            f.write("tremblay,trenblay\n")
+            f.write("Gagnon,gagon\n")
+            for i in range(1000):
+                f.write("name%d,nmae%d\n" % (i, i))
+        self.path = os.path.join(self.tmpdir.name, "names.arrow")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_build(self):
+        table = MisspellingTable.build(self.csv, self.path)
+        self.assertEqual(len(table), 1002)
+        self.assertEqual(sorted(table.variants("TREMBLAY")), ["TREMBLAI", "TRENBLAY"])
+        self.assertEqual(sorted(table.variants("tremblay")), ["tremblai", "trenblay"])
+        self.assertEqual(table.variants("name999"), ["nmae999"])
+        self.assertEqual(table.variants("Roy"), [])
+        self.assertNotIn("Roy", table)
+        self.assertEqual(table.choice("Gagnon", random.Random(1)), "Gagon")
+
+        # Written as a single record batch, read without copies
+        with pa.memory_map(self.path) as source:
+            self.assertEqual(pa.ipc.open_file(source).num_record_batches, 1)
+
+        # Pickled tables reopen the memory mapped files
+        clone = pickle.loads(pickle.dumps(table))
+        self.assertEqual(clone.path, self.path)
+        self.assertEqual(clone.variants("name10"), ["nmae10"])
+
+    def test_record_batches(self):
+        MisspellingTable.build(self.csv, self.path)
+        with pa.memory_map(self.path) as source:
+            grouped = pa.ipc.open_file(source).read_all()
+        # Tables written in several batches are indexed across batches
+        path = os.path.join(self.tmpdir.name, "batches.arrow")
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, grouped.schema) as writer:
+                writer.write_table(grouped, max_chunksize=100)
+        shutil.copy(self.path + ".index.npy", path + ".index.npy")
+        table = MisspellingTable(path)
+        self.assertEqual(len(table._words), 11)
+        self.assertEqual(len(table), 1002)
+        for i in (0, 99, 100, 999):
+            self.assertEqual(table.variants("name%d" % i), ["nmae%d" % i])
+
+    def test_misspell(self):
+        MisspellingTable.build(self.csv, self.path)
+
+        model = Table()
+        schema = model.info.schema.info
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "last_name"
+        model.info.aux.duplicate.probability = 1
+        model.info.aux.duplicate.maximum = 1
+        modifier = model.info.aux.record_modifier
+        modifier.max_record_modifiers = 1
+        modifier.max_field_modifiers = 1
+        name_mod = modifier.fields.add()
+        name_mod.selection = 1.0
+        name_mod.name = "Name"
+        name_mod.probabilities.misspell = 1.0
+
+        s2 = Synthesizer(model, "en_CA", seed=4053, misspellings={"Name": self.path})
+        mod = s2.mod
+        self.assertEqual(mod.misspell("Name", "Gagnon"), "Gagon")
+        self.assertEqual(mod.misspell("Name", "Marie Gagnon"), "Marie Gagon")
+        self.assertEqual(mod.misspell("Name", "Roy"), "Roy")
+        self.assertEqual(mod.misspell("Other", "Gagnon"), "Gagnon")
+
+        row = ["Gagnon"]
+        mod.modify(row)
+        self.assertEqual(row, ["Gagon"])
+        self.assertEqual(mod.counters["misspell"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,12 +26,18 @@ import tempfile
 import uuid
 import logging
 import io
+import os
 import csv
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
 # from collections import OrderedDict
 from artemis_format.pymodels.table_pb2 import Table
 from artemis_format.pymodels.cronus_pb2 import TableObjectInfo
 from dolos.recordbatchgen import RecordBatchGen
+from dolos.simutable.synthesizer import Synthesizer
 
 
 logging.getLogger().setLevel(logging.INFO)
@@ -76,6 +82,618 @@ class RBGenTestCase(unittest.TestCase):
                 for row in csv.reader(textio):
                     print(row)
 
+    def test_rbgen_arrow(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        field = schema.fields.add()
+        field.name = "UPC"
+        field.info.type = "Integer"
+        field.info.length = 13
+        field.info.aux.generator.name = "ean"
+        g_table_msg = g_table.SerializeToString()
+
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=2,
+            num_rows=1000,
+            file_type=5,  # Arrow RecordBatch
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+        )
+
+        generator.initialize()
+        for batch in generator:
+            self.assertEqual(batch.num_rows, 1000)
+            self.assertEqual(batch.schema.names, ["Name", "UPC"])
+
+    def test_rbgen_columnar(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        g_table.info.aux.duplicate.probability = 0.5
+        g_table.info.aux.duplicate.maximum = 2
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "record_id"
+        field.info.type = "String"
+        field.info.length = 20
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 20
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        options = dict(
+            nbatches=1,
+            num_rows=100,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+            seed=42,
+        )
+        batches = {}
+        for file_type in (5, 2):
+            generator = RecordBatchGen("generator", file_type=file_type, **options)
+            generator.initialize()
+            batches[file_type] = next(generator)
+
+        # Writers fill column buffers with the values of the row path
+        synthesizer = Synthesizer(g_table, "en_CA", seed=generator.batch_seed(0))
+        rows = [synthesizer.generate() for _ in range(100)]
+        batch = batches[5]
+        self.assertEqual(batch.column(0).to_pylist(), [row[0] for row in rows])
+        self.assertEqual(batch.column(1).to_pylist(), [row[1] for row in rows])
+        self.assertIn("-dup-", "".join(row[0] for row in rows))
+
+        data = batches[2].to_pybytes().decode()
+        self.assertEqual(len(data), 100 * 40)
+        for i, row in enumerate(rows):
+            self.assertEqual(data[i * 40 : i * 40 + 20].rstrip(), row[0][:20])
+
+        # column_batches generates by column, duplicates follow their original
+        generator = RecordBatchGen(
+            "generator", file_type=5, column_batches=True, **options
+        )
+        generator.initialize()
+        batch = next(generator)
+        synthesizer = Synthesizer(g_table, "en_CA", seed=generator.batch_seed(0))
+        columns = synthesizer.generate_batch(100)
+        self.assertEqual(batch.column(0).to_pylist(), columns["record_id"].tolist())
+        self.assertEqual(batch.column(1).to_pylist(), columns["Name"].tolist())
+
+    def test_rbgen_workers(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "record_id"
+        field.info.type = "String"
+        field.info.length = 10
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        outputs = []
+        for workers in (0, 1, 3):
+            generator = RecordBatchGen(
+                "generator",
+                nbatches=5,
+                num_rows=100,
+                file_type=1,
+                table_id=g_table.uuid,
+                table_msg=g_table_msg,
+                seed=42,
+                workers=workers,
+            )
+            generator.initialize()
+            outputs.append([batch.to_pybytes() for batch in generator])
+
+        self.assertEqual(len(outputs[0]), 5)
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        # Record ids are offset by the batch index
+        self.assertIn(b"rec-400-id", outputs[0][4])
+
+        # Metrics are collected from the worker processes
+        metrics = generator.snapshot()
+        self.assertEqual(metrics["rows"], 500)
+        self.assertGreater(metrics["field_time"]["Name"], 0)
+
+    def test_rbgen_prefetch(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        outputs = []
+        for prefetch in (0, 2):
+            generator = RecordBatchGen(
+                "generator",
+                nbatches=4,
+                num_rows=100,
+                file_type=1,
+                table_id=g_table.uuid,
+                table_msg=g_table_msg,
+                seed=42,
+                prefetch=prefetch,
+            )
+            generator.initialize()
+            outputs.append([batch.to_pybytes() for batch in generator])
+
+        self.assertEqual(len(outputs[1]), 4)
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(generator.snapshot()["rows"], 400)
+        self.assertGreater(generator.snapshot()["field_time"]["Name"], 0)
+
+        # The prefetch thread owns the synthesizer until closed
+        generator.reset()
+        first = next(generator).to_pybytes()
+        with self.assertRaises(ValueError):
+            generator.generate_batch(0)
+        generator.close()
+        self.assertEqual(generator.generate_batch(0).to_pybytes(), first)
+
+    def test_rbgen_write_csv(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=4,
+            num_rows=50,
+            file_type=1,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+        )
+        generator.initialize()
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            files = generator.write_csv(
+                os.path.join(dirpath, "test_{}.csv"), maxrows=100
+            )
+            self.assertEqual(len(files), 2)
+            for path in files:
+                with open(path, newline="") as f:
+                    rows = list(csv.reader(f))
+                self.assertEqual(len(rows), 101)
+                self.assertEqual(rows[0], ["Name"])
+                self.assertNotIn(["Name"], rows[1:])
+
+    def test_rbgen_fwf(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        field = schema.fields.add()
+        field.name = "Value"
+        field.info.type = "Integer"
+        field.info.length = 5
+        field.info.aux.generator.name = "random_int"
+        g_table_msg = g_table.SerializeToString()
+
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=2,
+            num_rows=100,
+            file_type=2,  # Encodes the data as fixed width fields
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+        )
+        generator.initialize()
+        for batch in generator:
+            data = batch.to_pybytes().decode()
+            self.assertEqual(len(data), 100 * 15)
+            for i in range(0, len(data), 15):
+                record = data[i : i + 15]
+                # last digit of a positive integer is overpunched
+                self.assertIn(record[-1], "{ABCDEFGHI")
+                self.assertTrue(record[10:-1].isdigit())
+
+    def test_rbgen_fwf_fallback(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        for name, ftype, length, fake in (
+            ("Name", "String", 6, "name"),
+            ("Value", "Integer", 5, "random_int"),
+            ("Code", "Integer", 4, "random_int"),
+            ("Empty", "String", 0, "city"),
+            ("City", "String", 3, "city"),
+        ):
+            field = schema.fields.add()
+            field.name = name
+            field.info.type = ftype
+            field.info.length = length
+            field.info.aux.generator.name = fake
+        generator = RecordBatchGen(
+            "generator",
+            file_type=2,
+            table_id=g_table.uuid,
+            table_msg=g_table.SerializeToString(),
+        )
+        generator.initialize()
+
+        # Only the columns that cannot be vectorized are encoded by value
+        columns = [
+            ["Zoë", "Côté", "Roy", None],
+            [1, -2, None, 12345],
+            ["12 3", 45, "7", None],
+            ["a", "b", "c", "d"],
+            ["Aïn", "Ste", "Ville", "Qc"],
+        ]
+        columns = [np.array(column, dtype=object) for column in columns]
+        for codec in ("utf8", "latin1"):
+            generator.codec = codec
+            generator.compile_fwf_layout()
+            expected = "".join(generator.fwf_encode_row(row) for row in zip(*columns))
+            data = generator.fwf_encode_batch(columns).to_pybytes()
+            self.assertEqual(data, expected.encode(codec))
+
+    def test_rbgen_csv_quoting(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "Address"
+        field.info.type = "String"
+        field.info.length = 100
+        field.info.aux.generator.name = "address"
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=1,
+            num_rows=100,
+            file_type=1,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+        )
+        generator.initialize()
+        for batch in generator:
+            data = batch.to_pybytes().decode()
+            rows = list(csv.reader(io.StringIO(data, newline="")))
+            self.assertEqual(len(rows), 101)
+            self.assertEqual(rows[0], ["Address", "Name"])
+            for row in rows:
+                self.assertEqual(len(row), 2)
+
+    def test_rbgen_mistyped(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        g_table.info.aux.duplicate.probability = 1
+        g_table.info.aux.duplicate.maximum = 1
+        modifier = g_table.info.aux.record_modifier
+        modifier.max_record_modifiers = 1
+        modifier.max_field_modifiers = 1
+        upc_mod = modifier.fields.add()
+        upc_mod.selection = 1.0
+        upc_mod.name = "UPC"
+        upc_mod.probabilities.split = 1.0
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "record_id"
+        field.info.type = "String"
+        field.info.length = 20
+        field = schema.fields.add()
+        field.name = "UPC"
+        field.info.type = "Integer"
+        field.info.length = 14
+        field.info.aux.generator.name = "ean"
+        g_table_msg = g_table.SerializeToString()
+
+        # Split duplicates of an Integer field are written verbatim in csv
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=1,
+            num_rows=100,
+            file_type=1,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+            seed=42,
+        )
+        generator.initialize()
+        data = next(generator).to_pybytes().decode()
+        rows = list(csv.reader(io.StringIO(data, newline="")))[1:]
+        self.assertEqual(len(rows), 100)
+        upcs = [row[1] for row in rows]
+        self.assertTrue(all(upcs))
+        self.assertTrue(any(" " in upc for upc in upcs))
+
+        # Typed formats hold the modified field as strings
+        for file_type in (5, 6):
+            generator = RecordBatchGen(
+                "generator",
+                nbatches=1,
+                num_rows=100,
+                file_type=file_type,
+                table_id=g_table.uuid,
+                table_msg=g_table_msg,
+                seed=42,
+            )
+            generator.initialize()
+            self.assertEqual(generator.pa_schema.field("UPC").type, pa.string())
+            batch = next(generator)
+            if file_type == 6:
+                batch = pq.read_table(pa.BufferReader(batch))
+            self.assertEqual(batch.column(1).to_pylist(), upcs)
+
+    def test_rbgen_csv_text(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "UPC"
+        field.info.type = "Integer"
+        field.info.length = 13
+        field.info.aux.generator.name = "ean"
+        field = schema.fields.add()
+        field.name = "Code"
+        field.info.type = "Postal"
+        field.info.length = 7
+        field.info.aux.generator.name = "postcode"
+        g_table_msg = g_table.SerializeToString()
+
+        # Digit strings keep their leading zeros, unknown types are text
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=1,
+            num_rows=1000,
+            file_type=1,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+            seed=3,
+        )
+        generator.initialize()
+        data = next(generator).to_pybytes().decode()
+        rows = list(csv.reader(io.StringIO(data, newline="")))[1:]
+        self.assertEqual({len(row[0]) for row in rows}, {13})
+        self.assertTrue(any(row[0].startswith("0") for row in rows))
+
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=1,
+            num_rows=10,
+            file_type=5,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+        )
+        with self.assertRaises(ValueError):
+            generator.initialize()
+
+    def test_rbgen_parquet(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=4,
+            num_rows=100,
+            file_type=6,  # Parquet
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+            parquet_row_group_size=200,
+        )
+        generator.initialize()
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            files = generator.write_parquet(os.path.join(dirpath, "test.parquet"))
+            self.assertEqual(len(files), 1)
+            parquet_file = pq.ParquetFile(files[0])
+            self.assertEqual(parquet_file.metadata.num_rows, 400)
+            self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+            column = parquet_file.metadata.row_group(0).column(0)
+            self.assertTrue(column.is_stats_set)
+
+    def test_rbgen_pa_schema(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        field = schema.fields.add()
+        field.name = "Province"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "province"
+        field = schema.fields.add()
+        field.name = "Value"
+        field.info.type = "Integer"
+        field.info.length = 10
+        field.info.aux.generator.name = "random_int"
+        field = schema.fields.add()
+        field.name = "DOB"
+        field.info.type = "DateTime"
+        field.info.length = 10
+        field.info.aux.generator.name = "date"
+        g_table_msg = g_table.SerializeToString()
+
+        generator = RecordBatchGen(
+            "generator",
+            nbatches=3,
+            num_rows=100,
+            file_type=5,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+        )
+        generator.initialize()
+        self.assertEqual(generator.pa_schema.field("Value").type, pa.int64())
+        self.assertTrue(
+            pa.types.is_dictionary(generator.pa_schema.field("Province").type)
+        )
+
+        sink = pa.BufferOutputStream()
+        self.assertEqual(generator.write_recordbatchfile(sink), [])
+        table = pa.ipc.open_file(sink.getvalue()).read_all()
+        self.assertEqual(table.num_rows, 300)
+        self.assertEqual(table.schema, generator.pa_schema)
+
+    def test_rbgen_generate_batch(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "record_id"
+        field.info.type = "String"
+        field.info.length = 10
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        options = dict(
+            nbatches=5,
+            num_rows=100,
+            file_type=1,
+            table_id=g_table.uuid,
+            table_msg=g_table_msg,
+            seed=42,
+            seekable=True,
+        )
+        generator = RecordBatchGen("generator", **options)
+        generator.initialize()
+        batches = [batch.to_pybytes() for batch in generator]
+
+        generator = RecordBatchGen("generator", **options)
+        generator.initialize()
+        self.assertEqual(generator.generate_batch(3).to_pybytes(), batches[3])
+        self.assertEqual(generator.generate_batch(0).to_pybytes(), batches[0])
+
+        # Pools are filled once from the base seed and shared by all batches
+        options.update(pool_size=50)
+        generator = RecordBatchGen("generator", **options)
+        generator.initialize()
+        batches = [batch.to_pybytes() for batch in generator]
+        self.assertEqual(generator.snapshot()["pools"]["Name"]["misses"], 50)
+        generator = RecordBatchGen("generator", **options)
+        generator.initialize()
+        self.assertEqual(generator.generate_batch(3).to_pybytes(), batches[3])
+
+    def test_rbgen_reservoir(self):
+
+        g_table = Table()
+        g_table.name = "EvolveModel"
+        g_table.uuid = str(uuid.uuid4())
+        g_table.info.aux.duplicate.probability = 0.5
+        g_table.info.aux.duplicate.maximum = 2
+        schema = g_table.info.schema.info
+        field = schema.fields.add()
+        field.name = "record_id"
+        field.info.type = "String"
+        field.info.length = 10
+        field = schema.fields.add()
+        field.name = "Name"
+        field.info.type = "String"
+        field.info.length = 10
+        field.info.aux.generator.name = "name"
+        g_table_msg = g_table.SerializeToString()
+
+        for seed in (None, 42):
+            options = dict(
+                nbatches=4,
+                num_rows=100,
+                file_type=5,
+                table_id=g_table.uuid,
+                table_msg=g_table_msg,
+                reservoir_size=50,
+            )
+            if seed is not None:
+                options["seed"] = seed
+            generator = RecordBatchGen("generator", **options)
+            generator.initialize()
+            batch_of = {}
+            later = 0
+            for idx, batch in enumerate(generator):
+                for record_id in batch.column(0).to_pylist():
+                    original = record_id.split("-dup-")[0]
+                    if original == record_id:
+                        batch_of[record_id] = idx
+                    elif batch_of[original] < idx:
+                        later += 1
+
+            # Serial batches carry duplicates over to later batches,
+            # batches seeded by index hold their own duplicates
+            metrics = generator.snapshot()
+            if seed is None:
+                self.assertGreater(later, 0)
+            else:
+                self.assertEqual(later, 0)
+            # Nothing is left pending at the end of the stream
+            self.assertEqual(metrics["pending_originals"], 0)
+            self.assertEqual(metrics["rows"], 400)
+            self.assertEqual(metrics["duplicates"], 400 - len(batch_of))
+            distribution = metrics["duplicate_distribution"]
+            self.assertEqual(
+                metrics["duplicates"],
+                sum(n * count for n, count in distribution.items()),
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
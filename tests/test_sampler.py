@@ -0,0 +1,56 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+#
+# Copyright © Her Majesty the Queen in Right of Canada, as represented
+# by the Minister of Statistics Canada, 2019.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test alias method sampler
+"""
+
+import unittest
+import random
+
+import numpy as np
+
+from dolos.simutable.sampler import AliasSampler
+
+
+class SamplerTestCase(unittest.TestCase):
+    def test_draw_batch(self):
+        sampler = AliasSampler(["a", "b", "c"], [0.5, 0.3, 0.2])
+        rng = np.random.default_rng(4053)
+        draws = sampler.draw_batch(rng, 100000)
+        for value, prob in zip(["a", "b", "c"], [0.5, 0.3, 0.2]):
+            self.assertAlmostEqual(np.mean(draws == value), prob, delta=0.01)
+
+    def test_draw(self):
+        sampler = AliasSampler([1, 2, 3, 4], [1, 0, 2, 1])
+        rnd = random.Random(4053)
+        draws = [sampler.draw(rnd) for _ in range(100000)]
+        self.assertNotIn(2, draws)
+        self.assertAlmostEqual(draws.count(3) / len(draws), 0.5, delta=0.01)
+        self.assertAlmostEqual(sampler.mean(), 2.75)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            AliasSampler([1, 2], [1])
+        with self.assertRaises(ValueError):
+            AliasSampler([1, 2], [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
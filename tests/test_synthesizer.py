@@ -23,9 +23,16 @@ Test protobuf model implementation
 
 import unittest
 import logging
+import string
+from importlib import import_module
+
+import numpy as np
+import pyarrow as pa
 
 from artemis_format.pymodels.table_pb2 import Table
 from dolos.simutable.synthesizer import Synthesizer
+from dolos.simutable.loader import get_faker
+from dolos.simutable.providers import numpy_rng
 
 
 logging.getLogger().setLevel(logging.INFO)
@@ -62,6 +69,200 @@ class SynthesizerTestCase(unittest.TestCase):
         s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
         print(s2.generate())
 
+    def test_generate_columns(self):
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "record_id"
+        field1.info.type = "String"
+        field1.info.length = 10
+
+        field2 = schema.fields.add()
+        field2.name = "Name"
+        field2.info.type = "String"
+        field2.info.length = 10
+        field2.info.aux.generator.name = "name"
+
+        s1 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        rows = [s1.generate() for _ in range(20)]
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        columns = s2.generate_columns(20)
+        self.assertEqual(len(columns), 2)
+        self.assertEqual([list(row) for row in zip(*columns)], rows)
+
+    def test_generate_batch(self):
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "record_id"
+        field1.info.type = "String"
+        field1.info.length = 10
+
+        field2 = schema.fields.add()
+        field2.name = "Name"
+        field2.info.type = "String"
+        field2.info.length = 10
+        field2.info.aux.generator.name = "name"
+
+        field3 = schema.fields.add()
+        field3.name = "UPC"
+        field3.info.type = "Integer"
+        field3.info.length = 13
+        field3.info.aux.generator.name = "ean"
+        parm = field3.info.aux.generator.parameters.add()
+        parm.name = "ndigits"
+        parm.value = 13
+        parm.type = "int"
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        columns = s2.generate_batch(100)
+        self.assertEqual(list(columns), ["record_id", "Name", "UPC"])
+        self.assertEqual(columns["record_id"][99], "rec-99-id")
+        self.assertEqual(len(columns["UPC"][0]), 13)
+        self.assertEqual(s2.record_count, 100)
+        self.assertEqual(len(s2.generate_column("Name", 10)), 10)
+
+    def test_value_pool(self):
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "record_id"
+        field1.info.type = "String"
+        field1.info.length = 10
+
+        field2 = schema.fields.add()
+        field2.name = "Name"
+        field2.info.type = "String"
+        field2.info.length = 10
+        field2.info.aux.generator.name = "name"
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053, pool_size=10)
+        rows = [s2.generate() for _ in range(100)]
+        columns = s2.generate_batch(100)
+        names = set(row[1] for row in rows) | set(columns["Name"])
+        self.assertLessEqual(len(names), 10)
+        self.assertEqual(list(s2.pools), ["Name"])
+        stats = s2.pool_stats()["Name"]
+        self.assertEqual(stats["hits"], 200)
+        self.assertEqual(stats["misses"], 10)
+
+        # Snapshots of several synthesizers are summed
+        metrics = Synthesizer.merge_snapshots([s2.snapshot(), s2.snapshot()])
+        self.assertEqual(metrics["rows"], 400)
+        self.assertEqual(metrics["pools"]["Name"]["hits"], 400)
+        self.assertEqual(metrics["pools"]["Name"]["hit_rate"], stats["hit_rate"])
+
+        # Reseeded pools keep their values, index draws follow the seed
+        s2.reset(idx=0, seed=1)
+        first = s2.generate_batch(50)["Name"].tolist()
+        s2.generate_batch(50)
+        s2.reset(idx=0, seed=1)
+        self.assertEqual(s2.generate_batch(50)["Name"].tolist(), first)
+        self.assertEqual(s2.pool_stats()["Name"]["misses"], 10)
+
+        # Refreshed values last until the pool is reseeded
+        s3 = Synthesizer(model, "en_CA", seed=4053, pool_size=10, pool_refresh=20)
+        s3.reset(idx=0, seed=1)
+        first = [s3.generate() for _ in range(50)]
+        self.assertEqual(s3.pool_stats()["Name"]["misses"], 30)
+        s3.reset(idx=0, seed=1)
+        self.assertEqual([s3.generate() for _ in range(50)], first)
+
+    def test_faker_cache(self):
+        fake1 = get_faker("en_CA")
+        fake2 = get_faker("en_CA")
+        self.assertIsNot(fake1, fake2)
+        self.assertIs(fake1.name.__self__.generator, fake1)
+        self.assertIs(fake2.normal.__self__.generator, fake2)
+
+        fake1.seed_instance(4053)
+        fake2.seed_instance(4053)
+        self.assertEqual(fake1.name(), fake2.name())
+        fake1.name()
+        fake2.seed_instance(4053)
+        self.assertEqual(fake2.name(), get_faker("en_CA").seed_instance(4053).name())
+
+        # random_int of the numeric provider wins over the one
+        # inherited by providers registered after it
+        numeric = import_module("dolos.simutable.providers.numeric")
+        normal = import_module("dolos.simutable.providers.normal")
+        fake3 = get_faker("en_CA", [numeric, normal])
+        self.assertIsInstance(fake3.random_int.__self__, numeric.Provider)
+
+        # Providers cache a numpy Generator per faker generator
+        self.assertIs(numpy_rng(fake1), numpy_rng(fake1))
+        self.assertIsNot(numpy_rng(fake1), numpy_rng(get_faker("en_CA")))
+
+    def test_numeric_providers(self):
+        model = Table()
+        schema = model.info.schema.info
+        fields = (
+            ("Normal", "normal", (10.0, 2.0)),
+            ("LogNormal", "lognormal", (0.0, 0.5)),
+            ("Value", "random_int", (5, 15)),
+            ("UPC", "ean", (8,)),
+        )
+        for name, generator, values in fields:
+            field = schema.fields.add()
+            field.name = name
+            field.info.type = "Float"
+            field.info.length = 10
+            field.info.aux.generator.name = generator
+            for value in values:
+                parm = field.info.aux.generator.parameters.add()
+                parm.name = "parm"
+                parm.value = value
+                parm.type = type(value).__name__
+
+        s1 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        columns = s1.generate_batch(5000)
+        # Columns are numpy arrays whichever provider generated them
+        self.assertEqual(columns["Normal"].dtype, np.float64)
+        self.assertEqual(columns["UPC"].dtype, object)
+        self.assertAlmostEqual(columns["Normal"].mean(), 10.0, delta=0.1)
+        self.assertAlmostEqual(columns["Normal"].std(), 2.0, delta=0.1)
+        self.assertTrue((columns["LogNormal"] > 0).all())
+        self.assertEqual(columns["Value"].min(), 5)
+        self.assertEqual(columns["Value"].max(), 15)
+        for code in columns["UPC"][:100]:
+            digits = [int(x) for x in code]
+            weighted_sum = sum(x * y for x, y in zip(digits, [3, 1] * 4))
+            self.assertEqual(len(code), 8)
+            self.assertEqual(weighted_sum % 10, 0)
+
+        row = s1.generate()
+        self.assertIsInstance(row[0], float)
+        self.assertTrue(5 <= row[2] <= 15)
+        digits = [int(x) for x in row[3]]
+        self.assertEqual(sum(x * y for x, y in zip(digits, [3, 1] * 4)) % 10, 0)
+
+        # Seeding resets the numpy Generator of the providers
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        upc = columns["UPC"].tolist()
+        self.assertEqual(s2.generate_batch(5000)["UPC"].tolist(), upc)
+        s2.set_seed(4053)
+        self.assertEqual(s2.generate_batch(5000)["UPC"].tolist(), upc)
+
+    def test_list_parameters(self):
+        model = Table()
+        schema = model.info.schema.info
+        field = schema.fields.add()
+        field.name = "Size"
+        field.info.type = "Float"
+        field.info.length = 10
+        field.info.aux.generator.name = "random_element"
+        for value in (1.5, 2.5, 3.5):
+            parm = field.info.aux.generator.parameters.add()
+            parm.name = "parm"
+            parm.value = value
+            parm.type = "float"
+
+        # Generators not marked positional take the list as one argument
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        self.assertIn(s2.generate()[0], (1.5, 2.5, 3.5))
+        self.assertLessEqual(set(s2.generate_batch(10)["Size"]), {1.5, 2.5, 3.5})
+
     def test_glm_proto(self):
         model = Table()
         schema = model.info.schema.info
@@ -113,7 +314,112 @@ class SynthesizerTestCase(unittest.TestCase):
         var2.variable.CopyFrom(field2)
 
         s2 = Synthesizer(model, "en_CA")
-        print(s2.generate())
+        row = s2.generate()
+        print(row)
+        # inputs are generated once and passed to the glm
+        self.assertEqual(len(row), 3)
+
+    def test_dependencies(self):
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "Value"
+        field1.info.type = "Float"
+        field1.info.length = 10
+        field1.info.aux.generator.name = "random_int"
+        field1.info.aux.dependent = "Prediction"
+
+        # Listed before its input to check the evaluation order
+        field2 = schema.fields.add()
+        field2.name = "Derived"
+        field2.info.type = "Float"
+        field2.info.length = 10
+        field2.info.aux.generator.name = "glm"
+
+        field3 = schema.fields.add()
+        field3.name = "Prediction"
+        field3.info.type = "Float"
+        field3.info.length = 10
+        field3.info.aux.generator.name = "glm"
+        field3.info.aux.dependent = "Derived"
+
+        for field, upstream, beta in ((field3, field1, 2), (field2, field3, 3)):
+            generator = field.info.aux.generator
+            for name, value in (("beta1", beta), ("beta2", 1), ("sigma", 0)):
+                parm = generator.parameters.add()
+                parm.name = name
+                parm.value = value
+                parm.type = "int"
+            var = generator.parameters.add()
+            var.name = upstream.name
+            var.type = "Field"
+            var.variable.CopyFrom(upstream)
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        order = [field.name for field, _ in s2.resolve_dependencies(model)]
+        self.assertEqual(order, ["Value", "Prediction", "Derived"])
+
+        for _ in range(10):
+            value, derived, prediction = s2.generate()
+            self.assertAlmostEqual(prediction, 2 * value + 1)
+            self.assertAlmostEqual(derived, 3 * prediction + 1)
+
+        columns = s2.generate_batch(10)
+        self.assertEqual(list(columns), ["Value", "Derived", "Prediction"])
+        for value, derived, prediction in zip(*columns.values()):
+            self.assertAlmostEqual(prediction, 2 * value + 1)
+            self.assertAlmostEqual(derived, 3 * prediction + 1)
+
+        var = field1.info.aux.generator.parameters.add()
+        var.name = "Derived"
+        var.type = "Field"
+        with self.assertRaises(ValueError):
+            Synthesizer(model, "en_CA")
+
+    def test_glm_links(self):
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "Value"
+        field1.info.type = "Float"
+        field1.info.length = 10
+        field1.info.aux.generator.name = "random_int"
+
+        targets = {"Logistic": ("logistic", 0.0), "Count": ("poisson", 1.0986)}
+        for name, (link, intercept) in targets.items():
+            field = schema.fields.add()
+            field.name = name
+            field.info.type = "Integer"
+            field.info.length = 10
+            generator = field.info.aux.generator
+            generator.name = "glm"
+            for parm_name, value in (("beta1", 0.0), ("beta2", intercept)):
+                parm = generator.parameters.add()
+                parm.name = parm_name
+                parm.value = value
+                parm.type = "float"
+            parm = generator.parameters.add()
+            parm.name = "link"
+            parm.type = link
+            var = generator.parameters.add()
+            var.name = "Value"
+            var.type = "Field"
+            var.variable.CopyFrom(field1)
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        columns = s2.generate_batch(5000)
+        self.assertEqual(set(columns["Logistic"].tolist()), {0, 1})
+        self.assertAlmostEqual(columns["Logistic"].mean(), 0.5, delta=0.05)
+        self.assertAlmostEqual(columns["Count"].mean(), 3.0, delta=0.1)
+
+        row = s2.generate()
+        self.assertIn(row[1], (0, 1))
+        self.assertIsInstance(row[2], int)
+
+        model.info.schema.info.fields[1].info.aux.generator.parameters[2].type = "logit"
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        with self.assertRaises(ValueError):
+            s2.generate()
 
     def test_xduplicates(self):
 
@@ -149,6 +455,284 @@ class SynthesizerTestCase(unittest.TestCase):
         s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
         print(s2.generate())
 
+    def test_duplicate_batch(self):
+
+        model = Table()
+
+        model.info.aux.duplicate.probability = 1
+        model.info.aux.duplicate.distribution = "uniform"
+        model.info.aux.duplicate.maximum = 1
+        schema = model.info.schema.info
+
+        field1 = schema.fields.add()
+        field1.name = "record_id"
+        field1.info.type = "String"
+        field1.info.length = 10
+
+        field2 = schema.fields.add()
+        field2.name = "Name"
+        field2.info.type = "String"
+        field2.info.length = 10
+        field2.info.aux.generator.name = "name"
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        ndups = s2.plan_duplicates(11)
+        self.assertEqual(len(ndups) + ndups.sum(), 11)
+
+        columns = s2.generate_batch(10)
+        self.assertEqual(len(columns["Name"]), 10)
+        self.assertEqual(
+            columns["record_id"][:2].tolist(), ["rec-0-id", "rec-0-id-dup-0"]
+        )
+        self.assertEqual(columns["Name"][8], columns["Name"][9])
+        self.assertEqual(s2.stats["Original"], 5)
+        self.assertEqual(s2.stats["Duplicate"], 5)
+
+        metrics = s2.snapshot()
+        self.assertEqual(metrics["rows"], 10)
+        self.assertEqual(metrics["duplicates"], 5)
+        self.assertGreater(metrics["field_time"]["Name"], 0)
+
+    def test_duplicate_reservoir(self):
+
+        model = Table()
+        model.info.aux.duplicate.probability = 0.5
+        model.info.aux.duplicate.distribution = "uniform"
+        model.info.aux.duplicate.maximum = 3
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "record_id"
+        field1.info.type = "String"
+        field1.info.length = 10
+        field2 = schema.fields.add()
+        field2.name = "Name"
+        field2.info.type = "String"
+        field2.info.length = 10
+        field2.info.aux.generator.name = "name"
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053, reservoir_size=20)
+        positions = {}
+        gaps = []
+        for pos in range(5000):
+            record_id, name = s2.generate()
+            original = record_id.split("-dup-")[0]
+            if original == record_id:
+                positions[record_id] = (pos, name)
+            else:
+                # duplicates follow their original with the same values
+                self.assertEqual(positions[original][1], name)
+                gaps.append(pos - positions[original][0])
+            self.assertLessEqual(len(s2._reservoir), 20)
+
+        metrics = s2.snapshot()
+        self.assertEqual(metrics["duplicates"], len(gaps))
+        self.assertGreater(metrics["field_time"]["Name"], 0)
+        self.assertGreater(max(gaps), 20)
+        self.assertLess(sum(gap == 1 for gap in gaps), len(gaps) / 2)
+        # mean of 0.5 * 2 duplicates per original
+        self.assertAlmostEqual(len(gaps) / len(positions), 1.0, delta=0.1)
+
+        s2.reset()
+        self.assertEqual(s2.snapshot()["pending_originals"], 0)
+
+        # Draining emits every pending duplicate within the batch
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053, reservoir_size=20)
+        s2.generate_columns(500)
+        self.assertGreater(s2.snapshot()["pending_originals"], 0)
+        s2.generate_columns(200, drain=True)
+        metrics = s2.snapshot()
+        self.assertEqual(metrics["pending_originals"], 0)
+        self.assertEqual(metrics["rows"], 700)
+        distribution = metrics["duplicate_distribution"]
+        self.assertEqual(
+            metrics["duplicates"], sum(n * count for n, count in distribution.items())
+        )
+
+    def test_duplicate_distributions(self):
+
+        model = Table()
+        model.info.aux.duplicate.probability = 0.5
+        model.info.aux.duplicate.maximum = 5
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "record_id"
+        field1.info.type = "String"
+        field1.info.length = 10
+
+        for dist in ("uniform", "poisson", "zipf"):
+            model.info.aux.duplicate.distribution = dist
+            s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+            pdf = dict(s2.nduplicate_weights)
+            self.assertEqual(sorted(pdf), [1, 2, 3, 4, 5])
+            self.assertAlmostEqual(sum(pdf.values()), 1.0)
+            ndups = s2.draw_nduplicates(1000)
+            self.assertTrue(((ndups >= 1) & (ndups <= 5)).all())
+            if dist == "zipf":
+                self.assertGreater(pdf[1], pdf[5])
+            if dist == "poisson":
+                self.assertGreater(pdf[3], pdf[1])
+
+        model.info.aux.duplicate.distribution = "binomial"
+        with self.assertRaises(ValueError):
+            Synthesizer(model, "en_CA", idx=0, seed=4053)
+
+    def test_modify_batch(self):
+
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "Name"
+        field1.info.type = "String"
+        field1.info.length = 10
+        field1.info.aux.generator.name = "name"
+        model.info.aux.duplicate.probability = 1
+        model.info.aux.duplicate.maximum = 1
+
+        modifier = model.info.aux.record_modifier
+        modifier.max_modifications_in_record = 1
+        modifier.max_field_modifiers = 1
+        modifier.max_record_modifiers = 1
+        name_mod = modifier.fields.add()
+        name_mod.selection = 1.0
+        name_mod.name = "Name"
+
+        values = ["Jean Tremblay", "Zoë Côté", "", "x", None] * 20
+        batch = pa.RecordBatch.from_arrays([pa.array(values)], ["Name"])
+        changes = {"insert": 1, "delete": -1, "substitute": 0, "transpose": 0}
+        for name, change in changes.items():
+            setattr(name_mod.probabilities, name, 1.0)
+            s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+            setattr(name_mod.probabilities, name, 0.0)
+
+            result = s2.mod.modify_batch(batch).column(0).to_pylist()
+            self.assertEqual(len(result), len(values))
+            for before, after in zip(values, result):
+                if before is None:
+                    self.assertIsNone(after)
+                elif name == "insert" or len(before) > 1:
+                    self.assertEqual(len(after), len(before) + change)
+                if name == "transpose" and before is not None:
+                    self.assertEqual(sorted(after), sorted(before))
+            self.assertNotEqual(result[:2], values[:2])
+            # Null values are skipped by both counters
+            self.assertEqual(s2.mod.field_counters["Name"], 80)
+            self.assertEqual(s2.mod.counters[name], 80)
+
+        name_mod.probabilities.nullify = 1.0
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        result = s2.mod.modify_batch(batch).column(0)
+        self.assertEqual(result.null_count, len(values))
+        self.assertEqual(s2.mod.field_counters["Name"], 80)
+        self.assertEqual(s2.mod.counters["nullify"], 80)
+
+    def test_modify_unset(self):
+
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "Name"
+        field1.info.type = "String"
+        field1.info.length = 10
+        field1.info.aux.generator.name = "name"
+        model.info.aux.duplicate.probability = 1
+        model.info.aux.duplicate.maximum = 1
+        # max_record_modifiers left at 0, no modifications
+        name_mod = model.info.aux.record_modifier.fields.add()
+        name_mod.selection = 1.0
+        name_mod.name = "Name"
+        name_mod.probabilities.insert = 1.0
+
+        s2 = Synthesizer(model, "en_CA", seed=1)
+        records, _, _, _ = s2.mod.plan_batch(100)
+        self.assertEqual(len(records), 0)
+        columns = s2.generate_batch(100)
+        self.assertEqual(len(columns["Name"]), 100)
+        self.assertEqual(s2.mod.counters["insert"], 0)
+
+    def test_error_characters(self):
+
+        model = Table()
+        schema = model.info.schema.info
+        field1 = schema.fields.add()
+        field1.name = "Name"
+        field1.info.type = "String"
+        field1.info.length = 10
+        field1.info.aux.generator.name = "name"
+        model.info.aux.duplicate.probability = 1
+        model.info.aux.duplicate.maximum = 1
+        name_mod = model.info.aux.record_modifier.fields.add()
+        name_mod.selection = 1.0
+        name_mod.name = "Name"
+        name_mod.probabilities.substitute = 1.0
+
+        s2 = Synthesizer(model, "en_CA", idx=0, seed=4053)
+        mod = s2.mod
+        n = 20000
+        codes = np.full(n, ord("a"), dtype=np.uint32)
+        typos = mod.error_characters(s2.rng, codes, np.ones(n, dtype=np.int64))
+        # same row neighbour, or drawn at random
+        self.assertAlmostEqual(np.mean(typos == ord("s")), 0.4 + 0.3 / 26, delta=0.02)
+        in_col = np.isin(typos, [ord(c) for c in "qzw"])
+        self.assertAlmostEqual(np.mean(in_col), 0.3 + 0.3 * 3 / 26, delta=0.02)
+
+        codes = np.full(n, ord("5"), dtype=np.uint32)
+        typos = mod.error_characters(s2.rng, codes, np.zeros(n, dtype=np.int64))
+        self.assertTrue(((typos >= ord("0")) & (typos <= ord("9"))).all())
+        in_row = np.isin(typos, [ord("4"), ord("6")])
+        self.assertAlmostEqual(np.mean(in_row), 0.4 + 0.6 * 2 / 10, delta=0.02)
+
+        for _ in range(100):
+            self.assertIn(mod.error_character("5", string.digits), string.digits)
+            typo = mod.error_character("A", string.ascii_lowercase)
+            self.assertIn(typo, string.ascii_lowercase)
+
+    def test_field_swaps(self):
+
+        model = Table()
+        schema = model.info.schema.info
+        for name in ("GivenName", "Surname", "City"):
+            field = schema.fields.add()
+            field.name = name
+            field.info.type = "String"
+            field.info.length = 10
+            field.info.aux.generator.name = "city"
+        model.info.aux.duplicate.probability = 1
+        model.info.aux.duplicate.maximum = 1
+
+        # Swaps alone configure the modifier
+        swaps = {("GivenName", "Surname"): 0.5}
+        s2 = Synthesizer(model, "en_CA", seed=4053, field_swaps=swaps)
+        self.assertEqual(s2.mod.field_swaps, [("GivenName", "Surname", 0, 1, 0.5)])
+
+        n = 2000
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(["a"] * n), pa.array(["b"] * n), pa.array(["c"] * n)],
+            ["GivenName", "Surname", "City"],
+        )
+        result = s2.mod.modify_batch(batch)
+        swapped = np.array(result.column(0).to_pylist()) == "b"
+        self.assertAlmostEqual(swapped.mean(), 0.5, delta=0.05)
+        expected = np.where(swapped, "a", "b").tolist()
+        self.assertEqual(result.column(1).to_pylist(), expected)
+        self.assertEqual(result.column(2).to_pylist(), ["c"] * n)
+        self.assertEqual(s2.mod.counters["field_swap"], swapped.sum())
+
+        rows = [["a", "b", "c"] for _ in range(n)]
+        for row in rows:
+            s2.mod.modify(row)
+        swapped = sum(row == ["b", "a", "c"] for row in rows)
+        self.assertAlmostEqual(swapped / n, 0.5, delta=0.05)
+
+        columns = s2.generate_batch(100)
+        self.assertEqual(len(columns["Surname"]), 100)
+
+        with self.assertRaises(ValueError):
+            Synthesizer(model, "en_CA", field_swaps={("GivenName", "Phone"): 0.1})
+
+        model.info.aux.ClearField("duplicate")
+        with self.assertRaises(ValueError):
+            Synthesizer(model, "en_CA", field_swaps=swaps)
+
     def test_xmodifer(self):
 
         model = Table()
@@ -262,6 +846,25 @@ class SynthesizerTestCase(unittest.TestCase):
             protorows.append(s2.generate())
         print(protorows)
 
+        columns = s2.generate_batch(20)
+        self.assertEqual(len(columns["Street"]), 20)
+
+        # One modification per duplicate record
+        metrics = s2.snapshot()
+        self.assertEqual(metrics["rows"], 30)
+        modifications = metrics["modifier"]["modifications"]
+        self.assertEqual(sum(modifications.values()), metrics["duplicates"])
+        fields = metrics["modifier"]["fields"]
+        self.assertEqual(sum(fields.values()), metrics["duplicates"])
+        s2.plots()
+
+        # Field selection follows the selection probabilities
+        fields = [s2.mod.random_select(s2.mod.field_sampler) for _ in range(10000)]
+        self.assertAlmostEqual(fields.count("Street") / 10000, 0.9, delta=0.02)
+        sampler = s2.mod.modifier_samplers["Name"]
+        mods = [s2.mod.random_select(sampler) for _ in range(1000)]
+        self.assertNotIn("misspell", mods)
+
 
 if __name__ == "__main__":
     unittest.main()